@@ -0,0 +1,141 @@
+"""
+Artist ID resolution cache for the Telegram Cover Bot.
+This module remembers which iTunes artist ID a name resolves to, so repeat
+artist searches skip the artist lookup request.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, Optional
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+def normalize_artist_name(name: str) -> str:
+    """
+    Normalize an artist name for lookups.
+    
+    Applies Unicode compatibility normalization, case folding and whitespace
+    collapsing so "  The  Beatles" and "the beatles" share one entry.
+    
+    Args:
+        name: The artist name as typed by the user
+    
+    Returns:
+        The normalized name
+    """
+    return " ".join(unicodedata.normalize("NFKC", name).casefold().split())
+
+
+class ArtistIdCache:
+    """Persistent map of normalized artist names to iTunes artist IDs."""
+    
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        Initialize the artist ID cache.
+        
+        Args:
+            db_path: Path to the SQLite database file (optional, memory only if omitted)
+        """
+        self.db_path = db_path
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+        
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS artist_ids (
+                    name TEXT PRIMARY KEY,
+                    artist_id INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.commit()
+            
+            # The map is small, so keep all of it in memory
+            for name, artist_id in self._conn.execute("SELECT name, artist_id FROM artist_ids"):
+                self._ids[name] = artist_id
+    
+    def get(self, name: str) -> Optional[int]:
+        """
+        Get the artist ID for a name.
+        
+        Args:
+            name: The artist name
+        
+        Returns:
+            The iTunes artist ID or None if the name has not been resolved yet
+        """
+        artist_id = self._ids.get(normalize_artist_name(name))
+        
+        if artist_id is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        
+        return artist_id
+    
+    def set(self, name: str, artist_id: int) -> None:
+        """
+        Remember the artist ID for a name.
+        
+        Args:
+            name: The artist name
+            artist_id: The iTunes artist ID
+        """
+        key = normalize_artist_name(name)
+        self._ids[key] = artist_id
+        
+        if self._conn is None:
+            return
+        
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO artist_ids (name, artist_id, updated_at) VALUES (?, ?, ?)",
+                    (key, artist_id, time.time())
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error saving artist ID: {e}")
+    
+    def invalidate(self, name: str) -> None:
+        """
+        Forget the artist ID for a name.
+        
+        Args:
+            name: The artist name
+        """
+        key = normalize_artist_name(name)
+        self._ids.pop(key, None)
+        
+        if self._conn is None:
+            return
+        
+        try:
+            with self._lock:
+                self._conn.execute("DELETE FROM artist_ids WHERE name = ?", (key,))
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error removing artist ID: {e}")
+    
+    def close(self) -> None:
+        """Close the database connection."""
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
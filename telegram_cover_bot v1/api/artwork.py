@@ -0,0 +1,202 @@
+"""
+Artwork resolution for the Telegram Cover Bot.
+This module finds the largest artwork size actually available for a result
+and remembers the answer per collection.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+from PIL import ImageFile
+
+from api.models import CoverResult, HIGH_QUALITY_SIZE
+from config import (
+    ARTWORK_CANDIDATE_SIZES, ARTWORK_PROBE_BYTES, ARTWORK_PROBE_TIMEOUT,
+    ARTWORK_RESOLVER_MAX_ENTRIES
+)
+from utils.download_client import DownloadClient
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+class ArtworkResolver:
+    """
+    Resolve the best available artwork URL for a result.
+    
+    The artwork CDN answers any requested size, but never returns more pixels
+    than the source has. Each candidate size is therefore probed with a small
+    ranged request whose image header reveals the real dimensions, and the
+    smallest candidate that reaches the largest real size wins. The chosen
+    size is remembered per collection ID, so later requests for any track on
+    the same album skip the probes.
+    """
+    
+    def __init__(self, sizes: Sequence[int] = ARTWORK_CANDIDATE_SIZES,
+                 probe_bytes: int = ARTWORK_PROBE_BYTES,
+                 timeout: float = ARTWORK_PROBE_TIMEOUT,
+                 max_entries: int = ARTWORK_RESOLVER_MAX_ENTRIES,
+                 client: Optional[DownloadClient] = None):
+        """
+        Initialize the artwork resolver.
+        
+        Args:
+            sizes: Candidate artwork sizes in pixels
+            probe_bytes: Maximum number of bytes read per probe
+            timeout: Total timeout in seconds for a single probe
+            max_entries: Maximum number of remembered collections
+            client: Shared download client (optional, a new client is created if omitted)
+        """
+        self.sizes = sorted(sizes, reverse=True)
+        self.probe_bytes = probe_bytes
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_entries = max_entries
+        self.client = client or DownloadClient()
+        self._owns_client = client is None
+        self._best_sizes: "OrderedDict[int, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    async def close(self) -> None:
+        """Close the download client, unless it is shared."""
+        if self._owns_client:
+            await self.client.close()
+    
+    async def resolve(self, item: CoverResult) -> str:
+        """
+        Get the URL of the best available artwork for a result.
+        
+        Args:
+            item: The song or album result
+        
+        Returns:
+            Artwork URL, falling back to the default high quality URL if no
+            candidate could be probed
+        """
+        return (await self.resolve_ladder(item))[0]
+    
+    async def resolve_ladder(self, item: CoverResult) -> List[str]:
+        """
+        Get artwork URLs from the best available size down to the smallest candidate.
+        
+        Args:
+            item: The song or album result
+        
+        Returns:
+            Artwork URLs, best first, for fetching with fallbacks
+        """
+        size = await self._best_size(item)
+        if size is None:
+            size = HIGH_QUALITY_SIZE
+        
+        return [item.artwork_url(size)] + [
+            item.artwork_url(candidate) for candidate in self.sizes if candidate < size
+        ]
+    
+    async def _best_size(self, item: CoverResult) -> Optional[int]:
+        """
+        Get the best artwork size for a result, probing only for unknown collections.
+        
+        Args:
+            item: The song or album result
+        
+        Returns:
+            The best candidate size or None if no candidate could be probed
+        """
+        collection_id = item.collection_id
+        
+        if collection_id is not None and collection_id in self._best_sizes:
+            self._best_sizes.move_to_end(collection_id)
+            self.hits += 1
+            return self._best_sizes[collection_id]
+        
+        self.misses += 1
+        size = await self._probe_best_size(item)
+        
+        if size is not None and collection_id is not None:
+            self._best_sizes[collection_id] = size
+            if len(self._best_sizes) > self.max_entries:
+                self._best_sizes.popitem(last=False)
+        
+        return size
+    
+    async def _probe_best_size(self, item: CoverResult) -> Optional[int]:
+        """
+        Probe all candidate sizes concurrently.
+        
+        Args:
+            item: The song or album result
+        
+        Returns:
+            The smallest candidate size giving the largest real dimensions, or None
+        """
+        dimensions = await asyncio.gather(
+            *[self._probe(item.artwork_url(size)) for size in self.sizes]
+        )
+        
+        best_size = None
+        best_pixels = 0
+        
+        # Candidates are ordered largest first, so ties go to the smaller request
+        for size, dims in zip(self.sizes, dimensions):
+            if dims is None:
+                continue
+            pixels = dims[0] * dims[1]
+            if pixels >= best_pixels:
+                best_size, best_pixels = size, pixels
+        
+        return best_size
+    
+    async def _probe(self, url: str) -> Optional[Tuple[int, int]]:
+        """
+        Read just enough of an image to learn its dimensions.
+        
+        Args:
+            url: Artwork URL
+        
+        Returns:
+            Tuple of (width, height) or None if the image is unavailable
+        """
+        parser = ImageFile.Parser()
+        received = 0
+        
+        try:
+            session = self.client.get_session()
+            headers = {"Range": f"bytes=0-{self.probe_bytes - 1}"}
+            
+            async with session.get(url, headers=headers, timeout=self.timeout) as response:
+                if response.status not in (200, 206):
+                    return None
+                
+                # The CDN may ignore the range, so stop reading as soon as the header is parsed
+                async for chunk in response.content.iter_chunked(8192):
+                    parser.feed(chunk)
+                    received += len(chunk)
+                    if parser.image is not None or received >= self.probe_bytes:
+                        break
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            logger.warning(f"Error probing artwork {url}: {e}")
+            return None
+        
+        if parser.image is None:
+            return None
+        
+        return parser.image.size
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get resolver statistics.
+        
+        Returns:
+            Dictionary with remembered collections and hit/miss counts
+        """
+        return {
+            "collections": len(self._best_sizes),
+            "hits": self.hits,
+            "misses": self.misses
+        }
@@ -3,19 +3,21 @@ Base API interface for music services.
 This module defines the abstract base class for all API implementations.
 """
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, List, Optional, Any, Sequence
 
 
 class MusicAPI(ABC):
     """Abstract base class for music API implementations."""
     
     @abstractmethod
-    def search_song(self, query: str) -> List[Dict[str, Any]]:
+    async def search_song(self, query: str, countries: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
         """
         Search for songs by name.
         
         Args:
             query: The song name to search for
+            countries: Storefronts to search and merge, defaults to the
+                implementation's own storefront (optional)
             
         Returns:
             A list of song dictionaries containing at least:
@@ -28,12 +30,14 @@ class MusicAPI(ABC):
         pass
     
     @abstractmethod
-    def search_artist(self, query: str) -> List[Dict[str, Any]]:
+    async def search_artist(self, query: str, countries: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
         """
         Search for songs by artist.
         
         Args:
             query: The artist name to search for
+            countries: Storefronts to search and merge, defaults to the
+                implementation's own storefront (optional)
             
         Returns:
             A list of song dictionaries (same format as search_song)
@@ -41,12 +45,14 @@ class MusicAPI(ABC):
         pass
     
     @abstractmethod
-    def search_album(self, query: str) -> List[Dict[str, Any]]:
+    async def search_album(self, query: str, countries: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
         """
         Search for albums.
         
         Args:
             query: The album name to search for
+            countries: Storefronts to search and merge, defaults to the
+                implementation's own storefront (optional)
             
         Returns:
             A list of album dictionaries containing at least:
@@ -57,6 +63,22 @@ class MusicAPI(ABC):
         """
         pass
     
+    @abstractmethod
+    async def lookup_many(self, ids: Iterable[int], entity: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Look up many tracks, albums or artists by ID.
+        
+        Args:
+            ids: The IDs to look up
+            entity: Related entity type to include for each ID, e.g. "song" to
+                expand albums into their tracks (optional)
+            
+        Returns:
+            A list of song and album dictionaries (same format as search_song
+            and search_album)
+        """
+        pass
+    
     @abstractmethod
     def get_cover_url(self, item: Dict[str, Any], high_quality: bool = True) -> Optional[str]:
         """
@@ -70,3 +92,7 @@ class MusicAPI(ABC):
             URL to the cover image or None if not available
         """
         pass
+    
+    async def close(self) -> None:
+        """Release any network resources held by the implementation."""
+        pass
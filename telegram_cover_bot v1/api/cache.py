@@ -0,0 +1,343 @@
+"""
+Search result caching for music API implementations.
+This module provides a bounded TTL + LRU cache and a MusicAPI wrapper that
+serves repeated searches from memory, backed by an optional disk tier.
+"""
+import asyncio
+import sys
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Any, Hashable, Sequence, Tuple
+
+from api.base import MusicAPI
+from api.disk_cache import SearchDiskCache
+from utils.single_flight import SingleFlight
+from config import (
+    SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_MAX_BYTES,
+    SEARCH_CACHE_TTL, SEARCH_CACHE_EMPTY_TTL, SEARCH_CACHE_WARM_ENTRIES, SQLITE_FLUSH_BATCH
+)
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimate the memory footprint of a cached value.
+    
+    Args:
+        value: The value to measure (nested dicts, lists, slotted records and scalars)
+    
+    Returns:
+        Approximate size in bytes
+    """
+    size = sys.getsizeof(value)
+    
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key) + estimate_size(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += estimate_size(item)
+    elif hasattr(value, "__slots__"):
+        for slot in value.__slots__:
+            size += estimate_size(getattr(value, slot))
+    
+    return size
+
+
+class TTLCache:
+    """
+    In-process cache with per-entry expiry and LRU eviction.
+    
+    Eviction happens when either the entry count or the estimated byte size
+    exceeds its budget. Expired entries are dropped lazily on access.
+    """
+    
+    def __init__(self, max_entries: int = SEARCH_CACHE_MAX_ENTRIES,
+                 max_bytes: int = SEARCH_CACHE_MAX_BYTES):
+        """
+        Initialize the cache.
+        
+        Args:
+            max_entries: Maximum number of entries to keep
+            max_bytes: Maximum estimated size of all entries in bytes
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Get a value from the cache.
+        
+        Args:
+            key: Cache key
+        
+        Returns:
+            The cached value or None if missing or expired
+        """
+        entry = self._entries.get(key)
+        
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        value, expires_at, size = entry
+        
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        
+        # Mark as most recently used
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        """
+        Store a value in the cache.
+        
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Time to live in seconds
+        """
+        size = estimate_size(value)
+        
+        # Values larger than the whole budget are never cached
+        if size > self.max_bytes:
+            return
+        
+        if key in self._entries:
+            self._remove(key)
+        
+        self._entries[key] = (value, time.monotonic() + ttl, size)
+        self.current_bytes += size
+        
+        # Evict least recently used entries until we are within budget
+        while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+    
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Remove a value from the cache.
+        
+        Args:
+            key: Cache key
+        """
+        if key in self._entries:
+            self._remove(key)
+    
+    def clear(self) -> None:
+        """Remove all values from the cache."""
+        self._entries.clear()
+        self.current_bytes = 0
+    
+    def _remove(self, key: Hashable) -> None:
+        """Remove an entry and update the byte accounting."""
+        _, _, size = self._entries.pop(key)
+        self.current_bytes -= size
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        """Check for an unexpired value without counting a lookup or refreshing its LRU position."""
+        entry = self._entries.get(key)
+        return entry is not None and entry[1] > time.monotonic()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+        
+        Returns:
+            Dictionary with counters and current usage
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+class CachedMusicAPI(MusicAPI):
+    """MusicAPI wrapper that caches search results of any implementation."""
+    
+    def __init__(self, api: MusicAPI, cache: Optional[TTLCache] = None,
+                 ttls: Optional[Dict[str, float]] = None,
+                 empty_ttl: float = SEARCH_CACHE_EMPTY_TTL,
+                 disk_cache: Optional[SearchDiskCache] = None):
+        """
+        Initialize the cached API.
+        
+        Args:
+            api: The music API implementation to wrap
+            cache: Cache instance (optional, a new one is created if omitted)
+            ttls: Time to live in seconds per search type (optional)
+            empty_ttl: Time to live in seconds for searches with no results
+            disk_cache: Persistent cache consulted on memory misses (optional)
+        """
+        self.api = api
+        self.cache = cache if cache is not None else TTLCache()
+        self.disk_cache = disk_cache
+        self.ttls = ttls or SEARCH_CACHE_TTL
+        self.empty_ttl = empty_ttl
+        self.flights = SingleFlight()
+        
+        # Memory-tier hits not yet added to the disk tier: (count, time of the last hit) per key
+        self._memory_hits: Dict[Hashable, Tuple[int, float]] = {}
+        self._pending_hits = 0
+        self._hit_flush: Optional[asyncio.Task] = None
+    
+    def _make_key(self, query: str, entity: str,
+                  countries: Optional[Sequence[str]] = None) -> Tuple[str, str, Optional[str], Optional[int]]:
+        """
+        Build the cache key for a search.
+        
+        Args:
+            query: The search query
+            entity: The search type (song, artist, album)
+            countries: Storefronts searched (optional)
+        
+        Returns:
+            Tuple of (normalized term, entity, country, limit)
+        """
+        term = " ".join(query.lower().split())
+        country = ",".join(countries) if countries else getattr(self.api, "country", None)
+        return (term, entity, country, getattr(self.api, "limit", None))
+    
+    async def _cached_search(self, query: str, entity: str, search,
+                             countries: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Serve a search from the cache, falling back to the wrapped API.
+        
+        Args:
+            query: The search query
+            entity: The search type (song, artist, album)
+            search: Coroutine function of the wrapped API performing the search
+            countries: Storefronts to search (optional)
+        
+        Returns:
+            A list of result dictionaries
+        """
+        key = self._make_key(query, entity, countries)
+        results = self.cache.get(key)
+        
+        if results is None:
+            # Identical concurrent searches share one upstream request
+            results = await self.flights.do(
+                key, lambda: self._fetch(key, query, entity, lambda q: search(q, countries))
+            )
+        elif self.disk_cache:
+            self._record_hit(key)
+        
+        # Hand out a copy so callers cannot reorder the cached list
+        return list(results)
+    
+    def _record_hit(self, key: Tuple) -> None:
+        """Count a memory-tier hit and write the counts to the disk tier once a batch is full."""
+        count, _ = self._memory_hits.get(key, (0, 0.0))
+        self._memory_hits[key] = (count + 1, time.time())
+        self._pending_hits += 1
+        
+        if self._pending_hits >= SQLITE_FLUSH_BATCH and (self._hit_flush is None or self._hit_flush.done()):
+            self._hit_flush = asyncio.create_task(self._flush_hits())
+    
+    async def _flush_hits(self) -> None:
+        """Add the counted memory-tier hits to the disk tier."""
+        hits, self._memory_hits = self._memory_hits, {}
+        self._pending_hits = 0
+        if hits:
+            await asyncio.to_thread(self.disk_cache.record_hits, hits)
+    
+    async def _fetch(self, key: Tuple, query: str, entity: str, search) -> List[Dict[str, Any]]:
+        """Load results from the disk tier or the wrapped API and store them in the cache."""
+        if self.disk_cache:
+            stored = await asyncio.to_thread(self.disk_cache.get, key)
+            if stored is not None:
+                results, remaining_ttl = stored
+                self.cache.set(key, results, remaining_ttl)
+                return results
+        
+        results = await search(query)
+        ttl = self.ttls.get(entity, 3600) if results else self.empty_ttl
+        self.cache.set(key, results, ttl)
+        
+        if self.disk_cache:
+            await asyncio.to_thread(self.disk_cache.set, key, results, ttl)
+        
+        return results
+    
+    async def warm_up(self, limit: int = SEARCH_CACHE_WARM_ENTRIES) -> int:
+        """
+        Load the most used searches from the disk tier into memory.
+        
+        Args:
+            limit: Maximum number of searches to load
+            
+        Returns:
+            Number of searches loaded
+        """
+        if not self.disk_cache:
+            return 0
+        
+        entries = await asyncio.to_thread(self.disk_cache.get_hottest, limit)
+        
+        # Insert coldest first so the hottest searches end up most recently used
+        for key, results, remaining_ttl in reversed(entries):
+            self.cache.set(key, results, remaining_ttl)
+        
+        return len(entries)
+    
+    async def search_song(self, query: str, countries: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Search for songs by name, using cached results when available."""
+        return await self._cached_search(query, "song", self.api.search_song, countries)
+    
+    async def search_artist(self, query: str, countries: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Search for songs by artist, using cached results when available."""
+        return await self._cached_search(query, "artist", self.api.search_artist, countries)
+    
+    async def search_album(self, query: str, countries: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Search for albums, using cached results when available."""
+        return await self._cached_search(query, "album", self.api.search_album, countries)
+    
+    async def lookup_many(self, ids: Iterable[int], entity: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Look up many items by ID; lookups always go to the wrapped API so they stay fresh."""
+        return await self.api.lookup_many(ids, entity)
+    
+    def get_cover_url(self, item: Dict[str, Any], high_quality: bool = True) -> Optional[str]:
+        """Extract cover URL from an item using the wrapped API."""
+        return self.api.get_cover_url(item, high_quality)
+    
+    async def close(self) -> None:
+        """Close the wrapped API and the disk tier."""
+        await self.api.close()
+        
+        if self.disk_cache:
+            if self._hit_flush is not None:
+                await self._hit_flush
+            await self._flush_hits()
+            self.disk_cache.close()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+        
+        Returns:
+            Dictionary with cache counters, usage and coalesced request counts
+        """
+        stats = self.cache.get_stats()
+        stats["coalesced"] = self.flights.get_stats()
+        return stats
@@ -0,0 +1,215 @@
+"""
+Persistent search result cache for the Telegram Cover Bot.
+This module stores parsed search results in SQLite so the bot does not
+start cold after a restart.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from api.models import CoverResult
+from config import SEARCH_DISK_CACHE_MAX_ENTRIES
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+class SearchDiskCache:
+    """SQLite-backed cache of parsed search results with TTL and size-capped eviction."""
+    
+    def __init__(self, db_path: str, max_entries: int = SEARCH_DISK_CACHE_MAX_ENTRIES):
+        """
+        Initialize the disk cache.
+        
+        Args:
+            db_path: Path to the SQLite database file
+            max_entries: Maximum number of stored searches
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        
+        # Calls arrive from worker threads, access is serialized by the lock
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS searches (
+                key TEXT PRIMARY KEY,
+                results TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_searches_last_access ON searches (last_access)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_searches_hits ON searches (hits)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_searches_expires_at ON searches (expires_at)")
+        self._conn.commit()
+    
+    @staticmethod
+    def _encode_key(key: Hashable) -> str:
+        """Serialize a cache key tuple to a stable string."""
+        return json.dumps(key, ensure_ascii=False)
+    
+    @staticmethod
+    def _decode_key(key: str) -> Tuple:
+        """Deserialize a cache key string back to a tuple."""
+        return tuple(json.loads(key))
+    
+    @staticmethod
+    def _encode_results(results: List[CoverResult]) -> str:
+        """Serialize results to JSON in their dictionary format."""
+        return json.dumps([result.to_dict() for result in results], ensure_ascii=False)
+    
+    @staticmethod
+    def _decode_results(results: str) -> List[CoverResult]:
+        """Deserialize JSON results back to result records."""
+        return [CoverResult.from_dict(result) for result in json.loads(results)]
+    
+    def get(self, key: Hashable) -> Optional[Tuple[List[CoverResult], float]]:
+        """
+        Get stored results for a search.
+        
+        Args:
+            key: Cache key
+        
+        Returns:
+            Tuple of (results, remaining TTL in seconds) or None if missing or expired
+        """
+        encoded = self._encode_key(key)
+        now = time.time()
+        
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT results, expires_at FROM searches WHERE key = ?", (encoded,)
+                ).fetchone()
+                
+                if row is None:
+                    return None
+                
+                if row[1] <= now:
+                    self._conn.execute("DELETE FROM searches WHERE key = ?", (encoded,))
+                    self._conn.commit()
+                    return None
+                
+                self._conn.execute(
+                    "UPDATE searches SET hits = hits + 1, last_access = ? WHERE key = ?",
+                    (now, encoded)
+                )
+                self._conn.commit()
+            
+            return self._decode_results(row[0]), row[1] - now
+        except (sqlite3.Error, ValueError, AttributeError) as e:
+            logger.error(f"Error reading search cache: {e}")
+            return None
+    
+    def set(self, key: Hashable, results: List[CoverResult], ttl: float) -> None:
+        """
+        Store results for a search.
+        
+        Args:
+            key: Cache key
+            results: Parsed search results
+            ttl: Time to live in seconds
+        """
+        now = time.time()
+        
+        try:
+            with self._lock:
+                self._conn.execute(
+                    """
+                    INSERT INTO searches (key, results, expires_at, last_access, hits)
+                    VALUES (?, ?, ?, ?, 0)
+                    ON CONFLICT(key) DO UPDATE SET
+                        results = excluded.results,
+                        expires_at = excluded.expires_at,
+                        last_access = excluded.last_access
+                    """,
+                    (self._encode_key(key), self._encode_results(results), now + ttl, now)
+                )
+                self._evict(now)
+                self._conn.commit()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.error(f"Error writing search cache: {e}")
+    
+    def record_hits(self, hits: Dict[Hashable, Tuple[int, float]]) -> None:
+        """
+        Add hits served by the memory tier, so eviction and warm-up see them.
+        
+        Args:
+            hits: Number of hits and time of the last one per cache key
+        """
+        try:
+            with self._lock:
+                self._conn.executemany(
+                    "UPDATE searches SET hits = hits + ?, last_access = MAX(last_access, ?) WHERE key = ?",
+                    [(count, last_access, self._encode_key(key)) for key, (count, last_access) in hits.items()]
+                )
+                self._conn.commit()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.error(f"Error recording search cache hits: {e}")
+    
+    def _evict(self, now: float) -> None:
+        """Drop expired searches, then the least recently used ones above the size cap."""
+        self._conn.execute("DELETE FROM searches WHERE expires_at <= ?", (now,))
+        
+        count = self._conn.execute("SELECT COUNT(*) FROM searches").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                """
+                DELETE FROM searches WHERE key IN (
+                    SELECT key FROM searches ORDER BY last_access ASC LIMIT ?
+                )
+                """,
+                (count - self.max_entries,)
+            )
+    
+    def get_hottest(self, limit: int) -> List[Tuple[Tuple, List[CoverResult], float]]:
+        """
+        Get the most frequently used unexpired searches.
+        
+        Args:
+            limit: Maximum number of searches to return
+        
+        Returns:
+            List of (key, results, remaining TTL in seconds) tuples
+        """
+        now = time.time()
+        entries = []
+        
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    """
+                    SELECT key, results, expires_at FROM searches
+                    WHERE expires_at > ?
+                    ORDER BY hits DESC, last_access DESC
+                    LIMIT ?
+                    """,
+                    (now, limit)
+                ).fetchall()
+            
+            for key, results, expires_at in rows:
+                entries.append((self._decode_key(key), self._decode_results(results), expires_at - now))
+        except (sqlite3.Error, ValueError) as e:
+            logger.error(f"Error loading hottest searches: {e}")
+        
+        return entries
+    
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -1,21 +1,77 @@
 """
 iTunes Search API implementation for fetching music covers.
 """
-import requests
-from typing import Dict, List, Optional, Any
+import asyncio
+import time
+import aiohttp
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Any, Sequence
 from api.base import MusicAPI
+from api.artist_cache import ArtistIdCache
+from api.models import CoverResult
+from api.rate_limiter import RateLimiter
+from config import (
+    ITUNES_TIMEOUT, HTTP_POOL_SIZE, HTTP_KEEPALIVE_TIMEOUT, DEFAULT_LIMIT,
+    ITUNES_MAX_QUEUE_WAIT, ITUNES_MAX_RETRIES, ITUNES_LOOKUP_BATCH_SIZE,
+    STOREFRONT_MERGE_WINDOW
+)
 
 
 class iTunesAPI(MusicAPI):
     """Implementation of the iTunes Search API for fetching music covers."""
     
     BASE_URL = "https://itunes.apple.com/search"
+    LOOKUP_URL = "https://itunes.apple.com/lookup"
     
-    def __init__(self):
-        """Initialize the iTunes API client."""
-        self.session = requests.Session()
+    def __init__(self, timeout: float = ITUNES_TIMEOUT, pool_size: int = HTTP_POOL_SIZE,
+                 country: str = "US", limit: int = DEFAULT_LIMIT,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 artist_cache: Optional[ArtistIdCache] = None):
+        """
+        Initialize the iTunes API client.
+        
+        Args:
+            timeout: Total timeout in seconds for a single API request
+            pool_size: Maximum number of pooled keep-alive connections
+            country: Storefront to search (US by default for wider content availability)
+            limit: Default maximum number of results per search
+            rate_limiter: Limiter shared by all requests (optional, a new one is created if omitted)
+            artist_cache: Artist name to ID map (optional, an in-memory one is created if omitted)
+        """
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.artist_cache = artist_cache or ArtistIdCache()
+        self.country = country
+        self.limit = limit
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.pool_size = pool_size
+        self.session: Optional[aiohttp.ClientSession] = None
     
-    def _search(self, query: str, media: str = "music", entity: str = None, limit: int = 10) -> Dict[str, Any]:
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Get the shared HTTP session, creating it on first use.
+        
+        The session has to be created inside the running event loop, so it is
+        built lazily rather than in the constructor.
+        
+        Returns:
+            The pooled aiohttp client session
+        """
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT
+            )
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self.session
+    
+    async def close(self) -> None:
+        """Close the HTTP session and release pooled connections."""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+        self.artist_cache.close()
+    
+    async def _search(self, query: str, media: str = "music", entity: str = None, limit: int = None,
+                      country: str = None) -> Dict[str, Any]:
         """
         Perform a search using the iTunes Search API.
         
@@ -23,7 +79,8 @@ class iTunesAPI(MusicAPI):
             query: The search query
             media: The media type to search for (music, podcast, etc.)
             entity: The entity type to search for (song, album, artist)
-            limit: Maximum number of results to return
+            limit: Maximum number of results to return (defaults to the client limit)
+            country: Storefront to search (defaults to the client storefront)
             
         Returns:
             The JSON response from the API
@@ -31,66 +88,269 @@ class iTunesAPI(MusicAPI):
         params = {
             "term": query,
             "media": media,
-            "limit": limit,
-            "country": "US"  # Default to US store for wider content availability
+            "limit": str(limit or self.limit),
+            "country": country or self.country
+        }
+        
+        if entity:
+            params["entity"] = entity
+            
+        return await self._request(self.BASE_URL, params)
+    
+    async def _lookup(self, ids: str, entity: str = None, limit: int = None,
+                      country: str = None) -> Dict[str, Any]:
+        """
+        Look up items by ID using the iTunes Lookup API.
+        
+        Args:
+            ids: Comma-separated iTunes IDs (artist, collection or track)
+            entity: The entity type of related items to include (song, album)
+            limit: Maximum number of related items per ID (optional)
+            country: Storefront to look up in (defaults to the client storefront)
+            
+        Returns:
+            The JSON response from the API
+        """
+        params = {
+            "id": ids,
+            "country": country or self.country
         }
         
         if entity:
             params["entity"] = entity
+        if limit:
+            params["limit"] = str(limit)
             
-        response = self.session.get(self.BASE_URL, params=params)
-        response.raise_for_status()  # Raise exception for HTTP errors
+        return await self._request(self.LOOKUP_URL, params)
+    
+    async def _request(self, url: str, params: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Send a rate limited GET request, retrying throttled responses with backoff.
+        
+        Args:
+            url: The endpoint URL
+            params: Query parameters
+            
+        Returns:
+            The JSON response from the API
+            
+        Raises:
+            APIBusyError: If the request cannot be sent within the latency budget
+        """
+        deadline = time.monotonic() + ITUNES_MAX_QUEUE_WAIT
+        session = self._get_session()
+        
+        for attempt in range(ITUNES_MAX_RETRIES + 1):
+            await self.rate_limiter.acquire(deadline)
+            
+            async with session.get(url, params=params) as response:
+                retry_after = response.headers.get("Retry-After")
+                retryable = self.rate_limiter.record_response(
+                    response.status,
+                    float(retry_after) if retry_after and retry_after.isdigit() else None
+                )
+                
+                if retryable and attempt < ITUNES_MAX_RETRIES:
+                    continue
+                
+                response.raise_for_status()  # Raise exception for HTTP errors
+                
+                # iTunes serves JSON as text/javascript, so skip the content type check
+                return await response.json(content_type=None)
+    
+    async def _fan_out(self, countries: Sequence[str],
+                       search: Callable[[str], Awaitable[List[CoverResult]]]) -> List[CoverResult]:
+        """
+        Run a search in several storefronts concurrently and merge the results.
+        
+        Results are returned once the first storefront answers with matches,
+        after a short merge window for the others; storefronts still running
+        after that are cancelled. Duplicates are removed by track ID, or by
+        collection ID for albums, keeping the order of the storefront list.
+        
+        Args:
+            countries: Storefront codes in priority order
+            search: Coroutine function performing the search in one storefront
+            
+        Returns:
+            The merged list of results
+        """
+        tasks = {asyncio.ensure_future(search(country)): index for index, country in enumerate(countries)}
+        answers: Dict[int, List[CoverResult]] = {}
+        errors = []
+        pending = set(tasks)
+        deadline = None
+        loop = asyncio.get_running_loop()
+        
+        try:
+            while pending:
+                timeout = None if deadline is None else max(0.0, deadline - loop.time())
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                
+                if not done:
+                    # Merge window is over
+                    break
+                
+                for task in done:
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                        continue
+                    
+                    answers[tasks[task]] = task.result()
+                    
+                    # Start the merge window on the first storefront with matches
+                    if task.result() and deadline is None:
+                        deadline = loop.time() + STOREFRONT_MERGE_WINDOW
+        finally:
+            for task in pending:
+                task.cancel()
         
-        return response.json()
+        if not answers and errors:
+            raise errors[0]
+        
+        merged = []
+        seen = set()
+        for index in sorted(answers):
+            for result in answers[index]:
+                key = result.track_id or result.collection_id
+                if key in seen:
+                    continue
+                seen.add(key)
+                merged.append(result)
+        
+        return merged
     
-    def search_song(self, query: str) -> List[Dict[str, Any]]:
+    async def _search_in(self, countries: Optional[Sequence[str]],
+                         search: Callable[[Optional[str]], Awaitable[List[CoverResult]]]) -> List[CoverResult]:
+        """
+        Run a search in the requested storefronts.
+        
+        Args:
+            countries: Storefront codes, or None for the client storefront
+            search: Coroutine function performing the search in one storefront
+            
+        Returns:
+            A list of results
+        """
+        if not countries or len(countries) == 1:
+            return await search(countries[0] if countries else None)
+        return await self._fan_out(countries, search)
+    
+    async def search_song(self, query: str, countries: Optional[Sequence[str]] = None) -> List[CoverResult]:
         """
         Search for songs by name.
         
         Args:
             query: The song name to search for
+            countries: Storefronts to search concurrently (optional)
             
         Returns:
-            A list of song dictionaries
+            A list of song results
         """
-        results = self._search(query, entity="song")
-        return self._parse_song_results(results)
+        async def search(country: Optional[str]) -> List[CoverResult]:
+            return self._parse_song_results(await self._search(query, entity="song", country=country))
+        
+        return await self._search_in(countries, search)
     
-    def search_artist(self, query: str) -> List[Dict[str, Any]]:
+    async def search_artist(self, query: str, countries: Optional[Sequence[str]] = None) -> List[CoverResult]:
         """
         Search for songs by artist.
         
         Args:
             query: The artist name to search for
+            countries: Storefronts to search concurrently (optional)
             
         Returns:
-            A list of song dictionaries
+            A list of song results
         """
-        # First search for the artist
-        artist_results = self._search(query, entity="musicArtist", limit=1)
+        return await self._search_in(countries, lambda country: self._search_artist(query, country))
+    
+    async def _search_artist(self, query: str, country: Optional[str]) -> List[CoverResult]:
+        """
+        Search for songs by artist in one storefront.
         
-        if not artist_results.get("resultCount", 0):
-            # If no exact artist match, just search for songs with this artist name
-            results = self._search(query, entity="song")
-            return self._parse_song_results(results)
+        Args:
+            query: The artist name to search for
+            country: Storefront to search (defaults to the client storefront)
+            
+        Returns:
+            A list of song results
+        """
+        # Resolve the artist ID, which rarely changes, from the cache first
+        artist_id = self.artist_cache.get(query)
+        
+        if artist_id is None:
+            artist_results = await self._search(query, entity="musicArtist", limit=1, country=country)
+            
+            if not artist_results.get("resultCount", 0):
+                # If no exact artist match, just search for songs with this artist name
+                results = await self._search(query, entity="song", country=country)
+                return self._parse_song_results(results)
+            
+            artist_id = artist_results["results"][0]["artistId"]
+            await asyncio.to_thread(self.artist_cache.set, query, artist_id)
+        
+        # Fetch the artist's songs by ID
+        results = self._parse_song_results(
+            await self._lookup(str(artist_id), entity="song", limit=20, country=country)
+        )
+        
+        if not results:
+            # The cached ID no longer has songs, so resolve the name again next time
+            await asyncio.to_thread(self.artist_cache.invalidate, query)
+            results = self._parse_song_results(await self._search(query, entity="song", country=country))
         
-        # If we found an artist, get their artist ID and search for their songs
-        artist_id = artist_results["results"][0]["artistId"]
-        results = self._search(f"artistId:{artist_id}", entity="song", limit=20)
-        return self._parse_song_results(results)
+        return results
     
-    def search_album(self, query: str) -> List[Dict[str, Any]]:
+    async def search_album(self, query: str, countries: Optional[Sequence[str]] = None) -> List[CoverResult]:
         """
         Search for albums.
         
         Args:
             query: The album name to search for
+            countries: Storefronts to search concurrently (optional)
+            
+        Returns:
+            A list of album results
+        """
+        async def search(country: Optional[str]) -> List[CoverResult]:
+            return self._parse_album_results(await self._search(query, entity="album", country=country))
+        
+        return await self._search_in(countries, search)
+    
+    async def lookup_many(self, ids: Iterable[int], entity: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Look up many tracks, albums or artists by ID.
+        
+        IDs are sent in comma-separated batches of up to ITUNES_LOOKUP_BATCH_SIZE,
+        and the batches are requested concurrently.
+        
+        Args:
+            ids: The iTunes IDs to look up
+            entity: Related entity type to include for each ID (optional)
             
         Returns:
-            A list of album dictionaries
+            A list of parsed song and album results in batch order
         """
-        results = self._search(query, entity="album")
-        return self._parse_album_results(results)
+        # Drop duplicates while keeping the caller's order
+        unique_ids = list(dict.fromkeys(str(item_id) for item_id in ids if item_id))
+        
+        if not unique_ids:
+            return []
+        
+        batches = [
+            unique_ids[i:i + ITUNES_LOOKUP_BATCH_SIZE]
+            for i in range(0, len(unique_ids), ITUNES_LOOKUP_BATCH_SIZE)
+        ]
+        responses = await asyncio.gather(*[
+            self._lookup(",".join(batch), entity=entity) for batch in batches
+        ])
+        
+        parsed_results = []
+        for response in responses:
+            parsed_results.extend(self._parse_lookup_results(response))
+            
+        return parsed_results
     
     def get_cover_url(self, item: Dict[str, Any], high_quality: bool = True) -> Optional[str]:
         """
@@ -107,7 +367,7 @@ class iTunesAPI(MusicAPI):
             return item["cover_url_hq"]
         return item.get("cover_url")
     
-    def _parse_song_results(self, results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _parse_song_results(self, results: Dict[str, Any]) -> List[CoverResult]:
         """
         Parse song results from iTunes API response.
         
@@ -115,7 +375,7 @@ class iTunesAPI(MusicAPI):
             results: The iTunes API response
             
         Returns:
-            A list of parsed song dictionaries
+            A list of parsed song results
         """
         parsed_results = []
         
@@ -133,26 +393,24 @@ class iTunesAPI(MusicAPI):
             # Common sizes: 100x100, 600x600, 1200x1200, 1400x1400, 1600x1600
             # The highest quality is usually 1600x1600 or 3000x3000 depending on the album
             
-            # Try to get the highest quality by replacing the size
-            # Format: https://is1-ssl.mzstatic.com/image/thumb/Music/v4/path/artworkUrl100.jpg
-            high_quality_url = artwork_url.replace("100x100", "1600x1600")
-            
-            parsed_results.append({
-                "title": item.get("trackName", "Unknown Title"),
-                "artist": item.get("artistName", "Unknown Artist"),
-                "album": item.get("collectionName", "Unknown Album"),
-                "cover_url": artwork_url,
-                "cover_url_hq": high_quality_url,
-                "preview_url": item.get("previewUrl"),
-                "track_id": item.get("trackId"),
-                "collection_id": item.get("collectionId"),
-                "artist_id": item.get("artistId"),
-                "release_date": item.get("releaseDate")
-            })
+            # Store the URL once as a size template; cover_url and cover_url_hq are derived from it
+            # Format: https://is1-ssl.mzstatic.com/image/thumb/Music/v4/path/100x100bb.jpg
+            parsed_results.append(CoverResult(
+                kind="song",
+                title=item.get("trackName", "Unknown Title"),
+                artist=item.get("artistName", "Unknown Artist"),
+                album=item.get("collectionName", "Unknown Album"),
+                artwork_template=CoverResult.make_template(artwork_url),
+                preview_url=item.get("previewUrl"),
+                track_id=item.get("trackId"),
+                collection_id=item.get("collectionId"),
+                artist_id=item.get("artistId"),
+                release_date=item.get("releaseDate")
+            ))
             
         return parsed_results
     
-    def _parse_album_results(self, results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _parse_album_results(self, results: Dict[str, Any]) -> List[CoverResult]:
         """
         Parse album results from iTunes API response.
         
@@ -160,7 +418,7 @@ class iTunesAPI(MusicAPI):
             results: The iTunes API response
             
         Returns:
-            A list of parsed album dictionaries
+            A list of parsed album results
         """
         parsed_results = []
         
@@ -173,19 +431,35 @@ class iTunesAPI(MusicAPI):
             if not artwork_url:
                 continue
                 
-            # Upgrade to high quality as with songs
-            high_quality_url = artwork_url.replace("100x100", "1600x1600")
-            
-            parsed_results.append({
-                "title": item.get("collectionName", "Unknown Album"),
-                "artist": item.get("artistName", "Unknown Artist"),
-                "cover_url": artwork_url,
-                "cover_url_hq": high_quality_url,
-                "collection_id": item.get("collectionId"),
-                "artist_id": item.get("artistId"),
-                "track_count": item.get("trackCount"),
-                "release_date": item.get("releaseDate"),
-                "genre": item.get("primaryGenreName")
-            })
+            # Store the URL as a size template as with songs
+            parsed_results.append(CoverResult(
+                kind="album",
+                title=item.get("collectionName", "Unknown Album"),
+                artist=item.get("artistName", "Unknown Artist"),
+                artwork_template=CoverResult.make_template(artwork_url),
+                collection_id=item.get("collectionId"),
+                artist_id=item.get("artistId"),
+                track_count=item.get("trackCount"),
+                release_date=item.get("releaseDate"),
+                genre=item.get("primaryGenreName")
+            ))
+            
+        return parsed_results
+    
+    def _parse_lookup_results(self, results: Dict[str, Any]) -> List[CoverResult]:
+        """
+        Parse mixed song and album results from iTunes Lookup API response.
+        
+        Args:
+            results: The iTunes API response
+            
+        Returns:
+            A list of parsed song and album results in response order
+        """
+        parsed_results = []
+        
+        for item in results.get("results", []):
+            single = {"results": [item]}
+            parsed_results.extend(self._parse_song_results(single) or self._parse_album_results(single))
             
         return parsed_results
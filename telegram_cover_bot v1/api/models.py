@@ -0,0 +1,189 @@
+"""
+Result models for the Telegram Cover Bot.
+This module defines the compact record type returned by music API searches.
+"""
+import sys
+from typing import Any, Dict, Optional
+
+
+# Placeholder for the artwork size in a URL template
+SIZE_PLACEHOLDER = "{size}"
+
+# Artwork sizes exposed through cover_url and cover_url_hq
+THUMBNAIL_SIZE = 100
+HIGH_QUALITY_SIZE = 1600
+
+# Dictionary keys of song and album results, in their original order
+SONG_KEYS = (
+    "title", "artist", "album", "cover_url", "cover_url_hq", "preview_url",
+    "track_id", "collection_id", "artist_id", "release_date"
+)
+ALBUM_KEYS = (
+    "title", "artist", "cover_url", "cover_url_hq", "collection_id", "artist_id",
+    "track_count", "release_date", "genre"
+)
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Intern a frequently repeated string so results share one copy."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class CoverResult:
+    """
+    Compact search result for a song or album.
+    
+    The artwork URL is stored once as a size-parameterized template, and
+    artist, album and genre strings are interned because the same values
+    repeat across many results and sessions. Read access mirrors the dict
+    results used before (``get``, ``[]`` and ``in``), so existing handlers and
+    keyboards work unchanged.
+    """
+    
+    __slots__ = (
+        "kind", "title", "artist", "album", "artwork_template", "preview_url",
+        "track_id", "collection_id", "artist_id", "release_date", "track_count", "genre"
+    )
+    
+    def __init__(self, kind: str, title: str, artist: str, artwork_template: str,
+                 album: Optional[str] = None, preview_url: Optional[str] = None,
+                 track_id: Optional[int] = None, collection_id: Optional[int] = None,
+                 artist_id: Optional[int] = None, release_date: Optional[str] = None,
+                 track_count: Optional[int] = None, genre: Optional[str] = None):
+        """
+        Initialize the result.
+        
+        Args:
+            kind: Result type, "song" or "album"
+            title: Song or album title
+            artist: Artist name
+            artwork_template: Artwork URL with the size replaced by SIZE_PLACEHOLDER
+            album: Album name (songs only)
+            preview_url: URL of the audio preview (songs only)
+            track_id: iTunes track ID (songs only)
+            collection_id: iTunes collection ID
+            artist_id: iTunes artist ID
+            release_date: Release date as returned by iTunes
+            track_count: Number of tracks (albums only)
+            genre: Primary genre name (albums only)
+        """
+        self.kind = _intern(kind)
+        self.title = title
+        self.artist = _intern(artist)
+        self.album = _intern(album)
+        self.artwork_template = artwork_template
+        self.preview_url = preview_url
+        self.track_id = track_id
+        self.collection_id = collection_id
+        self.artist_id = artist_id
+        self.release_date = _intern(release_date)
+        self.track_count = track_count
+        self.genre = _intern(genre)
+    
+    @staticmethod
+    def make_template(artwork_url: str, size: int = THUMBNAIL_SIZE) -> str:
+        """
+        Turn an artwork URL into a size-parameterized template.
+        
+        Args:
+            artwork_url: Artwork URL as returned by iTunes (e.g. .../100x100bb.jpg)
+            size: The size currently encoded in the URL
+        
+        Returns:
+            The URL with the size replaced by SIZE_PLACEHOLDER
+        """
+        return artwork_url.replace(f"{size}x{size}", f"{SIZE_PLACEHOLDER}x{SIZE_PLACEHOLDER}")
+    
+    def artwork_url(self, size: int) -> str:
+        """
+        Build the artwork URL for a given size.
+        
+        Args:
+            size: Width and height in pixels
+        
+        Returns:
+            Artwork URL for the requested size
+        """
+        return self.artwork_template.replace(SIZE_PLACEHOLDER, str(size))
+    
+    @property
+    def cover_url(self) -> str:
+        """Thumbnail artwork URL."""
+        return self.artwork_url(THUMBNAIL_SIZE)
+    
+    @property
+    def cover_url_hq(self) -> str:
+        """High quality artwork URL."""
+        return self.artwork_url(HIGH_QUALITY_SIZE)
+    
+    def _keys(self):
+        """Dictionary keys for this kind of result."""
+        return SONG_KEYS if self.kind == "song" else ALBUM_KEYS
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Get a field by its dictionary key.
+        
+        Args:
+            key: Dictionary key (e.g. "title" or "cover_url_hq")
+            default: Value returned when the field is missing or empty
+        
+        Returns:
+            The field value or the default
+        """
+        if key not in self._keys():
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in self:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys() and getattr(self, key) is not None
+    
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, CoverResult):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+    
+    def __repr__(self) -> str:
+        return f"CoverResult({self.kind!r}, {self.title!r}, {self.artist!r})"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the result to the dictionary format used for storage and logging.
+        
+        Returns:
+            Song or album dictionary
+        """
+        return {key: getattr(self, key) for key in self._keys()}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CoverResult":
+        """
+        Build a result from its dictionary format.
+        
+        Args:
+            data: Song or album dictionary as produced by to_dict
+        
+        Returns:
+            The result
+        """
+        kind = "song" if "track_id" in data else "album"
+        return cls(
+            kind=kind,
+            title=data.get("title"),
+            artist=data.get("artist"),
+            artwork_template=cls.make_template(data.get("cover_url", "")),
+            album=data.get("album"),
+            preview_url=data.get("preview_url"),
+            track_id=data.get("track_id"),
+            collection_id=data.get("collection_id"),
+            artist_id=data.get("artist_id"),
+            release_date=data.get("release_date"),
+            track_count=data.get("track_count"),
+            genre=data.get("genre")
+        )
@@ -0,0 +1,136 @@
+"""
+Client-side rate limiting for music API requests.
+This module keeps the bot under the upstream request quota and backs off
+when the service starts throttling.
+"""
+import asyncio
+import random
+import time
+from typing import Any, Dict, Optional
+
+from config import (
+    ITUNES_RATE_LIMIT_PER_MINUTE, ITUNES_RATE_LIMIT_BURST, ITUNES_MAX_QUEUE_WAIT,
+    ITUNES_BACKOFF_BASE, ITUNES_BACKOFF_MAX
+)
+
+
+class APIBusyError(Exception):
+    """Raised when a request cannot be sent within the latency budget."""
+    pass
+
+
+class RateLimiter:
+    """
+    Token bucket limiter with FIFO queueing and adaptive backoff.
+    
+    Each caller reserves the next free slot in the bucket, so waiting callers
+    are served in arrival order. When a reservation would wait longer than the
+    latency budget the caller is rejected immediately with APIBusyError.
+    """
+    
+    # Status codes that indicate throttling or an overloaded upstream
+    THROTTLE_STATUSES = {403, 429}
+    
+    def __init__(self, rate_per_minute: float = ITUNES_RATE_LIMIT_PER_MINUTE,
+                 burst: int = ITUNES_RATE_LIMIT_BURST,
+                 max_wait: float = ITUNES_MAX_QUEUE_WAIT,
+                 backoff_base: float = ITUNES_BACKOFF_BASE,
+                 backoff_max: float = ITUNES_BACKOFF_MAX):
+        """
+        Initialize the rate limiter.
+        
+        Args:
+            rate_per_minute: Sustained number of requests allowed per minute
+            burst: Number of requests that may be sent back to back
+            max_wait: Longest time in seconds a caller may be queued
+            backoff_base: Initial backoff in seconds after a throttled response
+            backoff_max: Maximum backoff in seconds
+        """
+        self.interval = 60.0 / rate_per_minute
+        self.burst_tolerance = (burst - 1) * self.interval
+        self.max_wait = max_wait
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        
+        self._theoretical_arrival = 0.0
+        self._backoff_until = 0.0
+        self._consecutive_failures = 0
+        
+        self.granted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.throttled = 0
+    
+    async def acquire(self, deadline: Optional[float] = None) -> None:
+        """
+        Wait for permission to send one request.
+        
+        Args:
+            deadline: Monotonic time by which the request must be sent (optional)
+        
+        Raises:
+            APIBusyError: If the wait would exceed the latency budget or deadline
+        """
+        now = time.monotonic()
+        budget = self.max_wait
+        if deadline is not None:
+            budget = min(budget, deadline - now)
+        
+        start = max(now, self._backoff_until)
+        arrival = max(self._theoretical_arrival, start)
+        send_at = max(start, arrival - self.burst_tolerance)
+        wait = send_at - now
+        
+        if wait > budget:
+            self.rejected += 1
+            raise APIBusyError(f"Music API is busy, next slot in {wait:.1f}s")
+        
+        # Reserve the slot before sleeping so later callers queue behind us
+        self._theoretical_arrival = arrival + self.interval
+        self.granted += 1
+        
+        if wait > 0:
+            self.queued += 1
+            await asyncio.sleep(wait)
+    
+    def record_response(self, status: int, retry_after: Optional[float] = None) -> bool:
+        """
+        Update the backoff state from a response status.
+        
+        Args:
+            status: HTTP status code of the response
+            retry_after: Server supplied Retry-After delay in seconds (optional)
+        
+        Returns:
+            True if the response was a throttling or server error that may be retried
+        """
+        if status not in self.THROTTLE_STATUSES and status < 500:
+            self._consecutive_failures = 0
+            return False
+        
+        self.throttled += 1
+        self._consecutive_failures += 1
+        
+        # Exponential backoff with jitter so concurrent callers do not retry in lockstep
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (self._consecutive_failures - 1))
+        delay *= random.uniform(0.5, 1.5)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        
+        self._backoff_until = max(self._backoff_until, time.monotonic() + delay)
+        return True
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get limiter statistics.
+        
+        Returns:
+            Dictionary with granted, queued, rejected and throttled counts
+        """
+        return {
+            "granted": self.granted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "throttled": self.throttled,
+            "backoff_remaining": max(0.0, self._backoff_until - time.monotonic())
+        }
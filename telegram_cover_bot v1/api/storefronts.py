@@ -0,0 +1,62 @@
+"""
+Storefront selection for multi-storefront searches.
+This module picks which iTunes storefronts to query from the script of the
+query and the user's language.
+"""
+import unicodedata
+from typing import List, Optional
+
+from config import MULTI_STOREFRONT_SEARCH, STOREFRONTS_BY_SCRIPT, STOREFRONTS_BY_LANGUAGE
+
+
+def detect_script(text: str) -> Optional[str]:
+    """
+    Detect the dominant non-Latin script of a text.
+    
+    Args:
+        text: The text to inspect
+    
+    Returns:
+        Script name as used in STOREFRONTS_BY_SCRIPT (e.g. "ARABIC") or None
+        if the text is written in Latin script or contains no letters
+    """
+    counts = {}
+    
+    for char in text:
+        if not char.isalpha():
+            continue
+        
+        # Unicode character names start with the script, e.g. "ARABIC LETTER ALEF"
+        script = unicodedata.name(char, "").split(" ")[0]
+        if script in STOREFRONTS_BY_SCRIPT:
+            counts[script] = counts.get(script, 0) + 1
+    
+    if not counts:
+        return None
+    
+    return max(counts, key=counts.get)
+
+
+def select_storefronts(query: str, user_lang: Optional[str] = None) -> Optional[List[str]]:
+    """
+    Choose the storefronts to search for a query.
+    
+    Args:
+        query: The search query
+        user_lang: The user's language code (optional)
+    
+    Returns:
+        Storefront codes in priority order, or None to search only the
+        default storefront (always None when MULTI_STOREFRONT_SEARCH is off)
+    """
+    if not MULTI_STOREFRONT_SEARCH:
+        return None
+    
+    script = detect_script(query)
+    if script:
+        return STOREFRONTS_BY_SCRIPT[script]
+    
+    if user_lang in STOREFRONTS_BY_LANGUAGE:
+        return STOREFRONTS_BY_LANGUAGE[user_lang]
+    
+    return None
@@ -0,0 +1,4 @@
+"""
+Benchmarks for the Telegram Cover Bot.
+Run individual benchmarks from the bot directory with python -m benchmarks.<name>.
+"""
@@ -0,0 +1,80 @@
+"""
+Benchmark of the perceptual cover index.
+Measures how far apart resized and recompressed copies of the same artwork
+hash, and how long near-duplicate lookups take in a full index.
+
+Run from the bot directory: python -m benchmarks.cover_index
+"""
+import random
+import time
+from io import BytesIO
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from config import COVER_INDEX_MAX_ENTRIES, COVER_HASH_MAX_DISTANCE
+from utils.cover_index import CoverIndex, dhash
+
+# Number of synthetic covers compared
+COVERS = 20
+
+# Number of timed lookups
+LOOKUPS = 1000
+
+
+def make_cover(seed: int) -> Image.Image:
+    """Create a 1600px cover of blurred colored shapes."""
+    rng = random.Random(seed)
+    image = Image.new("RGB", (1600, 1600))
+    draw = ImageDraw.Draw(image)
+    for _ in range(30):
+        x, y, size = rng.randrange(1600), rng.randrange(1600), rng.randrange(50, 600)
+        draw.ellipse((x, y, x + size, y + size), fill=tuple(rng.randrange(256) for _ in range(3)))
+    return image.filter(ImageFilter.GaussianBlur(3))
+
+
+def encode(image: Image.Image, size: int, quality: int) -> bytes:
+    """Resize a cover and encode it as JPEG."""
+    output = BytesIO()
+    image.resize((size, size)).save(output, format="JPEG", quality=quality)
+    return output.getvalue()
+
+
+def main() -> None:
+    """Print hash distances of copies and unrelated covers, and lookup timings."""
+    same, different = [], []
+    for seed in range(COVERS):
+        cover = make_cover(seed)
+        original = dhash(encode(cover, 1600, 90))
+        for size, quality in ((600, 70), (320, 40), (90, 60)):
+            same.append((dhash(encode(cover, size, quality)) ^ original).bit_count())
+        different.append((dhash(encode(make_cover(seed + COVERS), 1600, 90)) ^ original).bit_count())
+    print(f"copies: max distance {max(same)}, unrelated covers: min distance {min(different)}")
+    
+    cover_data = encode(make_cover(0), 1600, 90)
+    start = time.perf_counter()
+    for _ in range(COVERS):
+        dhash(cover_data)
+    print(f"dhash of a 1600px JPEG: {(time.perf_counter() - start) / COVERS * 1000:.2f} ms")
+    
+    rng = random.Random(0)
+    index = CoverIndex()
+    hashes = [rng.getrandbits(64) for _ in range(COVER_INDEX_MAX_ENTRIES)]
+    for number, value in enumerate(hashes):
+        index.add(value, f"collection:{number}", "photo", 1600, 1600)
+    
+    queries = []
+    for _ in range(LOOKUPS):
+        value = rng.choice(hashes)
+        for bit in rng.sample(range(64), COVER_HASH_MAX_DISTANCE):
+            value ^= 1 << bit
+        queries.append(value)
+    
+    start = time.perf_counter()
+    found = sum(1 for value in queries if index.find(value))
+    elapsed = time.perf_counter() - start
+    print(f"{len(hashes)} covers indexed: {elapsed / LOOKUPS * 1000:.3f} ms per lookup "
+          f"at distance {COVER_HASH_MAX_DISTANCE}, {found}/{LOOKUPS} found")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark of cover enhancement.
+Compares the four separate Pillow passes (sharpen, contrast, color,
+brightness) with the fused sharpen plus single color transform, and reports
+the cost per megapixel and the largest pixel difference between the two.
+
+Run from the bot directory: python -m benchmarks.enhancement
+"""
+import time
+from io import BytesIO
+from typing import Callable
+
+from PIL import Image, ImageChops, ImageEnhance, ImageFilter
+
+from utils.image_quality_validator import (
+    ImageQualityValidator, ENHANCE_CONTRAST, ENHANCE_COLOR, ENHANCE_BRIGHTNESS
+)
+
+# Cover sizes to benchmark, in pixels
+SIZES = [600, 1400, 3000]
+
+# Number of timed runs per size and path
+RUNS = 10
+
+
+def make_cover(size: int) -> Image.Image:
+    """Create a colorful decoded cover of the given size."""
+    noise = Image.effect_noise((size, size), 40)
+    gradient = Image.linear_gradient("L").resize((size, size))
+    return Image.merge("RGB", (noise, gradient, gradient.rotate(90)))
+
+
+def separate_passes(image: Image.Image) -> Image.Image:
+    """Enhance an image with four full-image passes, as enhance_image used to."""
+    image = image.filter(ImageFilter.SHARPEN)
+    image = ImageEnhance.Contrast(image).enhance(ENHANCE_CONTRAST)
+    image = ImageEnhance.Color(image).enhance(ENHANCE_COLOR)
+    return ImageEnhance.Brightness(image).enhance(ENHANCE_BRIGHTNESS)
+
+
+def fused_pass(image: Image.Image) -> Image.Image:
+    """Enhance an image with one convolution and one color transform."""
+    return ImageQualityValidator._apply_enhancements(image)
+
+
+def measure(func: Callable[[Image.Image], Image.Image], image: Image.Image) -> float:
+    """Return the median run time of a path in milliseconds."""
+    func(image)
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        func(image)
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+
+def main() -> None:
+    """Run the benchmark and print a table of median timings per megapixel."""
+    print(f"{'size':>6} {'separate ms/MP':>15} {'fused ms/MP':>12} {'speedup':>8} {'max diff':>9}")
+    for size in SIZES:
+        image = make_cover(size)
+        megapixels = size * size / 1e6
+        separate = measure(separate_passes, image)
+        fused = measure(fused_pass, image)
+        difference = max(high for _, high in ImageChops.difference(separate_passes(image), fused_pass(image)).getextrema())
+        print(f"{size:>6} {separate / megapixels:>15.1f} {fused / megapixels:>12.1f} "
+              f"{separate / fused:>7.2f}x {difference:>9}")
+    
+    # End to end on encoded bytes, including decode, quality checks and encode
+    output = BytesIO()
+    make_cover(1400).save(output, format="JPEG", quality=90)
+    validator = ImageQualityValidator()
+    start = time.perf_counter()
+    validator.enhance_image_data(output.getvalue())
+    print(f"enhance_image_data 1400px: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
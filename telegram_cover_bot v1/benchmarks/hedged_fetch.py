@@ -0,0 +1,91 @@
+"""
+Benchmark of hedged artwork downloads.
+Serves a simulated artwork CDN where the largest size is sometimes slow or
+missing, and compares sequential fallback with hedged fetching.
+
+Run from the bot directory: python -m benchmarks.hedged_fetch
+"""
+import asyncio
+import random
+import time
+from io import BytesIO
+
+from aiohttp import web
+from PIL import Image
+
+from utils.hedged_fetch import HedgedFetcher, LatencyTracker
+
+# Number of simulated cover requests
+REQUESTS = 200
+
+# Hedge delay used for the benchmark, in seconds
+HEDGE_DELAY = 0.2
+
+# Port of the simulated CDN
+PORT = 8799
+
+
+def make_cover(size: int) -> bytes:
+    """Create a JPEG cover of the given size."""
+    output = BytesIO()
+    Image.new("RGB", (size, size), "navy").save(output, format="JPEG")
+    return output.getvalue()
+
+
+async def serve(rng: random.Random) -> web.AppRunner:
+    """Start the simulated CDN: the large size is fast 70%, slow 20% and missing 10% of the time."""
+    covers = {1600: make_cover(1600), 1200: make_cover(1200)}
+    
+    async def artwork(request: web.Request) -> web.Response:
+        size = int(request.match_info["size"])
+        if size == 1600:
+            roll = rng.random()
+            if roll < 0.1:
+                await asyncio.sleep(0.3)
+                return web.Response(status=404)
+            await asyncio.sleep(1.5 if roll < 0.3 else 0.05)
+        else:
+            await asyncio.sleep(0.06)
+        return web.Response(body=covers[size], content_type="image/jpeg")
+    
+    app = web.Application()
+    app.router.add_get("/{size}.jpg", artwork)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", PORT).start()
+    return runner
+
+
+async def sequential(fetcher: HedgedFetcher, urls: list) -> None:
+    """Try each size in turn, as the handler did before hedging."""
+    for url in urls:
+        image_data, _, _ = await fetcher._download(url, 300, asyncio.Event())
+        if image_data is not None:
+            return
+
+
+async def main() -> None:
+    """Run both strategies against the same simulated CDN and print percentiles."""
+    runner = await serve(random.Random(42))
+    urls = [f"http://127.0.0.1:{PORT}/1600.jpg", f"http://127.0.0.1:{PORT}/1200.jpg"]
+    fetcher = HedgedFetcher(hedge_delay=HEDGE_DELAY)
+    
+    before = LatencyTracker()
+    for _ in range(REQUESTS):
+        start = time.monotonic()
+        await sequential(fetcher, urls)
+        before.record(time.monotonic() - start)
+    
+    for _ in range(REQUESTS):
+        await fetcher.fetch(urls, 300)
+    
+    print(f"sequential ms: {before.percentiles()}")
+    print(f"hedged ms:     {fetcher.latency.percentiles()}")
+    print(f"hedged {fetcher.hedged} of {fetcher.fetches}, served by a smaller size {fetcher.fallbacks} times")
+    
+    await fetcher.close()
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
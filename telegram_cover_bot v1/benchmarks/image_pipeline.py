@@ -0,0 +1,66 @@
+"""
+Benchmark of the cover image pipeline.
+Compares the separate validate/prepare/info path with the single-decode
+process_for_telegram path on synthetic covers.
+
+Run from the bot directory: python -m benchmarks.image_pipeline
+"""
+import time
+from io import BytesIO
+from typing import Callable
+
+from PIL import Image
+
+from utils.image_processor import ImageProcessor
+
+# Cover sizes to benchmark, in pixels
+SIZES = [600, 1400, 3000]
+
+# Number of timed runs per size and path
+RUNS = 10
+
+
+def make_cover(size: int) -> bytes:
+    """Create a noisy JPEG cover of the given size."""
+    image = Image.effect_noise((size, size), 40).convert("RGB")
+    output = BytesIO()
+    image.save(output, format="JPEG", quality=90)
+    return output.getvalue()
+
+
+def separate_path(image_data: bytes) -> None:
+    """Validate, prepare and describe an image the way the handler used to."""
+    buffer = BytesIO(image_data)
+    is_valid, image, error = ImageProcessor.validate_image(buffer)
+    ImageProcessor.prepare_for_telegram(buffer)
+    ImageProcessor.get_image_info(image)
+
+
+def single_path(image_data: bytes) -> None:
+    """Validate, prepare and describe an image with one decode."""
+    ImageProcessor.process_for_telegram(image_data)
+
+
+def measure(func: Callable[[bytes], None], image_data: bytes) -> float:
+    """Return the median run time of a path in milliseconds."""
+    func(image_data)
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        func(image_data)
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+
+def main() -> None:
+    """Run the benchmark and print a table of median timings."""
+    print(f"{'size':>6} {'separate ms':>12} {'single ms':>10} {'speedup':>8}")
+    for size in SIZES:
+        image_data = make_cover(size)
+        separate = measure(separate_path, image_data)
+        single = measure(single_path, image_data)
+        print(f"{size:>6} {separate:>12.1f} {single:>10.1f} {separate / single:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
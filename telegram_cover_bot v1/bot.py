@@ -7,13 +7,25 @@ from telegram import Update, BotCommand
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, ContextTypes
 import telegram
 
-from config import TELEGRAM_TOKEN, ADMIN_IDS
+from config import TELEGRAM_TOKEN, ADMIN_IDS, SEARCH_DISK_CACHE_FILE, ARTIST_ID_CACHE_FILE, FILE_ID_CACHE_FILE, COVER_INDEX_FILE, ARTWORK_CACHE_DIR
 from utils.session import SessionManager
 from utils.translation import TranslationManager
 from utils.analytics import AnalyticsManager
 from utils.social_sharing import SocialSharingManager
 from utils.admin import AdminManager
 from utils.database import InteractionDatabase
+from utils.file_id_cache import FileIdCache
+from utils.cover_index import CoverIndex
+from utils.artwork_cache import ArtworkCache
+from utils.image_executor import ImageExecutor
+from utils.hedged_fetch import HedgedFetcher
+from utils.download_client import DownloadClient
+from utils.prefetch import Prefetcher
+from api.itunes import iTunesAPI
+from api.cache import CachedMusicAPI
+from api.disk_cache import SearchDiskCache
+from api.artist_cache import ArtistIdCache
+from api.artwork import ArtworkResolver
 from handlers.commands import start_command, help_command
 from handlers.search import SearchHandler
 from handlers.group_support import GroupSupportHandler
@@ -21,6 +33,7 @@ from handlers.language import language_command, handle_language_callback
 from handlers.analytics import stats_command, handle_stats_callback
 from handlers.admin import broadcast_command, users_command, database_command, handle_admin_callback, handle_admin_message
 from handlers.audio import AudioHandler
+from handlers.photo import PhotoHandler
 
 
 # Enable logging
@@ -95,6 +108,34 @@ def main() -> None:
     os.makedirs(data_dir, exist_ok=True)
     database = InteractionDatabase(base_dir=data_dir)
     
+    # Shared music API client used by every handler, with repeated searches served
+    # from memory and persisted to disk so restarts do not start cold
+    search_disk_cache = SearchDiskCache(os.path.join(data_dir, SEARCH_DISK_CACHE_FILE))
+    artist_cache = ArtistIdCache(os.path.join(data_dir, ARTIST_ID_CACHE_FILE))
+    music_api = CachedMusicAPI(iTunesAPI(artist_cache=artist_cache), disk_cache=search_disk_cache)
+    
+    # Pooled keep-alive connections shared by every artwork download
+    download_client = DownloadClient()
+    artwork_resolver = ArtworkResolver(client=download_client)
+    
+    # Telegram file IDs of sent covers, so repeat covers are not uploaded again
+    file_id_cache = FileIdCache(os.path.join(data_dir, FILE_ID_CACHE_FILE))
+    
+    # Perceptual hashes of handled covers, so the same artwork is recognised at any size
+    cover_index = CoverIndex(os.path.join(data_dir, COVER_INDEX_FILE))
+    
+    # Downloaded artwork kept on disk, so covers requested again are not downloaded again
+    artwork_cache = ArtworkCache(os.path.join(data_dir, ARTWORK_CACHE_DIR))
+    
+    # Worker pool for decoding, resizing and encoding covers off the event loop
+    image_executor = ImageExecutor()
+    
+    # Artwork downloader falling back to smaller sizes when the largest is slow or missing
+    artwork_fetcher = HedgedFetcher(client=download_client)
+    
+    # Covers of the shown results page prepared in the background before the user picks one
+    prefetcher = Prefetcher()
+    
     # Get bot username for social sharing
     bot_username = ""
     
@@ -106,13 +147,39 @@ def main() -> None:
         
         # Set up commands
         await setup_commands(application)
+        
+        # Warm the in-memory search cache with the most used searches
+        warmed = await music_api.warm_up()
+        logger.info(f"Loaded {warmed} cached searches from disk")
+    
+    async def post_shutdown(application):
+        """Release network resources on shutdown."""
+        await music_api.close()
+        await artwork_resolver.close()
+        file_id_cache.close()
+        cover_index.close()
+        artwork_cache.close()
+        image_executor.shutdown()
+        await artwork_fetcher.close()
+        logger.info(f"Artwork download connections: {download_client.get_stats()}")
+        logger.info(f"Cover prefetching: {prefetcher.get_stats()}")
+        logger.info(f"Audio tag streaming: {audio_handler.audio_processor.get_stats()}")
+        await download_client.close()
     
     application.post_init = post_init
+    application.post_shutdown = post_shutdown
     
     # Initialize handlers
-    search_handler = SearchHandler(session_manager, translation_manager, analytics_manager, database)
-    group_handler = GroupSupportHandler(session_manager)
-    audio_handler = AudioHandler(session_manager, translation_manager, analytics_manager, database)
+    search_handler = SearchHandler(session_manager, translation_manager, analytics_manager, database, api=music_api,
+                                   artwork_resolver=artwork_resolver, file_id_cache=file_id_cache,
+                                   image_executor=image_executor, fetcher=artwork_fetcher,
+                                   cover_index=cover_index, artwork_cache=artwork_cache,
+                                   prefetcher=prefetcher)
+    group_handler = GroupSupportHandler(session_manager, api=music_api)
+    audio_handler = AudioHandler(session_manager, translation_manager, analytics_manager, database, api=music_api,
+                                 file_id_cache=file_id_cache, cover_index=cover_index, client=download_client)
+    photo_handler = PhotoHandler(session_manager, translation_manager, database,
+                                 cover_index=cover_index, file_id_cache=file_id_cache)
     
     # Initialize social sharing manager (after getting bot username)
     social_sharing_manager = None
@@ -268,6 +335,9 @@ def main() -> None:
     
     # Register audio file handler
     application.add_handler(MessageHandler(filters.AUDIO | filters.VOICE, audio_handler.handle_audio_file))
+    
+    # Register photo handler for reverse cover lookup in private chats
+    application.add_handler(MessageHandler(filters.PHOTO & filters.ChatType.PRIVATE, photo_handler.handle_photo))
 
     # Start the Bot
     application.run_polling()
@@ -14,8 +14,215 @@ DEFAULT_LIMIT = 10
 # Maximum image dimension
 MAX_IMAGE_DIMENSION = 1600
 
+# Minimum accepted cover width and height
+MIN_IMAGE_DIMENSION = 300
+
 # Image quality (1-100)
 IMAGE_QUALITY = 95
 
 # Default page size for results
 DEFAULT_PAGE_SIZE = 5
+
+# Total timeout in seconds for a single iTunes API request
+ITUNES_TIMEOUT = 10
+
+# Maximum number of pooled keep-alive HTTP connections
+HTTP_POOL_SIZE = 20
+
+# Seconds an idle pooled connection is kept open
+HTTP_KEEPALIVE_TIMEOUT = 30
+
+# Artwork downloads: maximum number of pooled connections to a single host
+DOWNLOAD_POOL_PER_HOST = 10
+
+# Artwork downloads: timeout in seconds for opening a connection
+DOWNLOAD_CONNECT_TIMEOUT = 5
+
+# Artwork downloads: seconds a resolved host name is cached
+DOWNLOAD_DNS_CACHE_TTL = 300
+
+# Search result cache: maximum number of cached searches
+SEARCH_CACHE_MAX_ENTRIES = 2000
+
+# Search result cache: approximate memory budget in bytes
+SEARCH_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# Search result cache: time to live in seconds per search type
+SEARCH_CACHE_TTL = {
+    "song": 6 * 3600,
+    "artist": 12 * 3600,
+    "album": 24 * 3600,
+}
+
+# Search result cache: time to live in seconds for searches with no results
+SEARCH_CACHE_EMPTY_TTL = 10 * 60
+
+# Persistent search cache: SQLite file name inside the data directory
+SEARCH_DISK_CACHE_FILE = "search_cache.sqlite3"
+
+# Persistent search cache: maximum number of stored searches
+SEARCH_DISK_CACHE_MAX_ENTRIES = 50000
+
+# Number of most used searches loaded into memory at startup
+SEARCH_CACHE_WARM_ENTRIES = 500
+
+# iTunes rate limit: sustained requests per minute (iTunes allows about 20 per IP)
+ITUNES_RATE_LIMIT_PER_MINUTE = 20
+
+# iTunes rate limit: requests that may be sent back to back
+ITUNES_RATE_LIMIT_BURST = 5
+
+# Longest time in seconds a search may wait for a rate limit slot before failing as busy
+ITUNES_MAX_QUEUE_WAIT = 5.0
+
+# Initial and maximum backoff in seconds after a throttled (403/429/5xx) response
+ITUNES_BACKOFF_BASE = 2.0
+ITUNES_BACKOFF_MAX = 60.0
+
+# Number of retries for throttled responses
+ITUNES_MAX_RETRIES = 2
+
+# Artist name to iTunes artist ID map: SQLite file name inside the data directory
+ARTIST_ID_CACHE_FILE = "artist_ids.sqlite3"
+
+# Telegram file ID cache: SQLite file name inside the data directory
+FILE_ID_CACHE_FILE = "file_ids.sqlite3"
+
+# Telegram file ID cache: maximum number of remembered covers
+FILE_ID_CACHE_MAX_ENTRIES = 100000
+
+# SQLite caches: number of deferred writes (e.g. usage timestamps) committed together
+SQLITE_FLUSH_BATCH = 100
+
+# Artwork disk cache: directory inside the data directory holding downloaded artwork
+ARTWORK_CACHE_DIR = "artwork"
+
+# Artwork disk cache: maximum total size of cached artwork in bytes
+ARTWORK_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Artwork disk cache: seconds before a ladder served from a smaller cached size is downloaded again for the best size
+ARTWORK_CACHE_REFRESH_INTERVAL = 3600
+
+# Perceptual cover index: SQLite file name inside the data directory
+COVER_INDEX_FILE = "cover_hashes.sqlite3"
+
+# Perceptual cover index: maximum number of indexed covers
+COVER_INDEX_MAX_ENTRIES = 100000
+
+# Perceptual cover index: largest difference hash distance (of 64 bits) at which two covers count as the same artwork
+COVER_HASH_MAX_DISTANCE = 7
+
+# Maximum number of IDs per iTunes lookup request (the endpoint accepts about 200)
+ITUNES_LOOKUP_BATCH_SIZE = 200
+
+# Multi-storefront search: query several iTunes storefronts concurrently and merge the results
+MULTI_STOREFRONT_SEARCH = False
+
+# Multi-storefront search: storefronts to query by the script the query is written in
+STOREFRONTS_BY_SCRIPT = {
+    "ARABIC": ["SA", "AE", "EG", "US"],
+    "CYRILLIC": ["RU", "UA", "US"],
+    "HEBREW": ["IL", "US"],
+    "GREEK": ["GR", "US"],
+    "HANGUL": ["KR", "US"],
+    "HIRAGANA": ["JP", "US"],
+    "KATAKANA": ["JP", "US"],
+    "CJK": ["JP", "TW", "HK", "US"],
+    "THAI": ["TH", "US"],
+    "DEVANAGARI": ["IN", "US"],
+}
+
+# Multi-storefront search: storefronts to query by user language when the query is in Latin script
+STOREFRONTS_BY_LANGUAGE = {
+    "ar": ["US", "SA", "AE", "EG"],
+    "es": ["US", "ES", "MX"],
+    "fr": ["US", "FR", "CA"],
+    "ru": ["US", "RU"],
+}
+
+# Multi-storefront search: seconds to wait for other storefronts after the first one answers
+STOREFRONT_MERGE_WINDOW = 0.3
+
+# Artwork resolution: candidate artwork sizes probed for the best available cover
+ARTWORK_CANDIDATE_SIZES = [3000, 1600, 1200, 600]
+
+# Artwork resolution: bytes read per probe, enough to reach the image header
+ARTWORK_PROBE_BYTES = 64 * 1024
+
+# Artwork resolution: timeout in seconds for a single probe
+ARTWORK_PROBE_TIMEOUT = 5
+
+# Artwork resolution: number of collections whose best artwork size is remembered
+ARTWORK_RESOLVER_MAX_ENTRIES = 10000
+
+# Image processing: number of worker threads (or processes) for decode, resize and encode
+IMAGE_WORKERS = 4
+
+# Image processing: use worker processes instead of threads (Pillow releases the GIL, so threads usually suffice)
+IMAGE_USE_PROCESSES = False
+
+# Image processing: jobs allowed to wait for a worker before callers are held back
+IMAGE_MAX_QUEUE = 32
+
+# Telegram photo limits: maximum upload size in bytes
+TELEGRAM_PHOTO_MAX_BYTES = 10 * 1024 * 1024
+
+# Telegram photo limits: maximum ratio between the longer and the shorter side
+TELEGRAM_PHOTO_MAX_RATIO = 20
+
+# Image processing: formats sent unchanged when they already fit the photo limits
+PASSTHROUGH_FORMATS = ["JPEG", "PNG"]
+
+# Image downloads: maximum number of bytes downloaded for one image
+MAX_DOWNLOAD_BYTES = 20 * 1024 * 1024
+
+# Image downloads: bytes read looking for the image header before giving up
+IMAGE_HEADER_MAX_BYTES = 256 * 1024
+
+# Artwork downloads: seconds to wait for a valid header before also requesting the next smaller size
+ARTWORK_HEDGE_DELAY = 0.5
+
+# Artwork downloads: total timeout in seconds for a single download
+ARTWORK_FETCH_TIMEOUT = 15
+
+# Artwork downloads: number of recent fetch latencies kept for percentiles
+LATENCY_SAMPLES = 1000
+
+# Quality scoring: side in pixels of the luminance planes that are scored
+QUALITY_SCORE_SIZE = 256
+
+# Quality scoring: blockiness above which a cover counts as heavily compressed (about 1.0 for clean JPEGs)
+QUALITY_MAX_BLOCKINESS = 1.8
+
+# Quality scoring: effective resolution below which a cover counts as upscaled (about 1.0 for native detail)
+QUALITY_MIN_EFFECTIVE_RESOLUTION = 0.6
+
+# Quality scoring: maximum number of duplicate search results compared before sending a cover
+QUALITY_MAX_CANDIDATES = 5
+
+# Quality scoring: artwork size in pixels downloaded to compare duplicate results (large enough to reveal upscaling)
+QUALITY_CANDIDATE_SIZE = 1000
+
+# Cover prefetch: number of covers on the shown results page prepared before the user picks one
+PREFETCH_TOP_K = 3
+
+# Cover prefetch: seconds a prepared cover is kept waiting to be picked
+PREFETCH_TTL = 120
+
+# Cover prefetch: maximum number of prepared covers kept
+PREFETCH_MAX_ENTRIES = 200
+
+# Cover prefetch: approximate memory budget in bytes for prepared covers
+PREFETCH_MAX_BYTES = 64 * 1024 * 1024
+
+# Cover prefetch: maximum number of covers prepared at once across all users
+PREFETCH_CONCURRENCY = 2
+
+# Audio files: largest file in bytes downloaded and parsed in memory, larger ones go through the temp directory
+AUDIO_MEMORY_MAX_BYTES = 20 * 1024 * 1024
+
+# Audio files: bytes read per chunk when streaming a download
+AUDIO_STREAM_CHUNK_BYTES = 64 * 1024
+
+# Audio files: total timeout in seconds for streaming a download
+AUDIO_STREAM_TIMEOUT = 120
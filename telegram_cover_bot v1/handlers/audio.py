@@ -4,17 +4,35 @@ This module provides handlers for processing audio files sent by users.
 """
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
+from telegram.error import BadRequest
+import asyncio
+import hashlib
 import os
 import logging
-from typing import Dict, Any, Optional, List
+from io import BytesIO
+from typing import Dict, Any, Optional, List, Tuple
 import time
+from PIL import Image
+import aiohttp
 
 from utils.session import SessionManager
 from utils.translation import TranslationManager
 from utils.analytics import AnalyticsManager
 from utils.database import InteractionDatabase
 from utils.audio_processor import AudioProcessor
+from utils.file_id_cache import FileIdCache
+from utils.cover_index import CoverIndex, dhash
+from utils.download_client import DownloadClient
+from utils.image_processor import ImageStreamReader
+from utils.quality_scoring import QualityScorer
+from api.base import MusicAPI
 from api.itunes import iTunesAPI
+from api.rate_limiter import APIBusyError
+from api.storefronts import select_storefronts
+from config import (
+    QUALITY_MAX_CANDIDATES, QUALITY_CANDIDATE_SIZE, AUDIO_MEMORY_MAX_BYTES,
+    AUDIO_STREAM_CHUNK_BYTES, AUDIO_STREAM_TIMEOUT, ARTWORK_FETCH_TIMEOUT
+)
 
 # Configure logging
 logging.basicConfig(
@@ -22,6 +40,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Identity of an extracted cover: (content hash source, difference hash, width, height)
+CoverIdentity = Tuple[str, int, int, int]
+
+
 class AudioHandler:
     """Handler for audio files sent by users."""
     
@@ -29,7 +51,11 @@ class AudioHandler:
                 session_manager: SessionManager, 
                 translation_manager: TranslationManager,
                 analytics_manager: Optional[AnalyticsManager] = None,
-                database: Optional[InteractionDatabase] = None):
+                database: Optional[InteractionDatabase] = None,
+                api: Optional[MusicAPI] = None,
+                file_id_cache: Optional[FileIdCache] = None,
+                cover_index: Optional[CoverIndex] = None,
+                client: Optional[DownloadClient] = None):
         """
         Initialize the audio handler.
         
@@ -38,6 +64,10 @@ class AudioHandler:
             translation_manager: Translation manager instance
             analytics_manager: Analytics manager instance (optional)
             database: Interaction database instance (optional)
+            api: Shared music API client (optional, a new iTunes client is created if omitted)
+            file_id_cache: Shared Telegram file ID cache (optional, a memory-only cache is created if omitted)
+            cover_index: Shared perceptual cover index (optional, a memory-only index is created if omitted)
+            client: Shared download client (optional, a new client is created if omitted)
         """
         self.session_manager = session_manager
         self.translation_manager = translation_manager
@@ -49,8 +79,18 @@ class AudioHandler:
         os.makedirs(temp_dir, exist_ok=True)
         self.audio_processor = AudioProcessor(temp_dir=temp_dir)
         
-        # Initialize iTunes API
-        self.itunes_api = iTunesAPI()
+        # Use the shared music API client if one was provided
+        self.itunes_api = api or iTunesAPI()
+        
+        # Remember uploaded covers so identical ones are not uploaded again
+        self.file_id_cache = file_id_cache if file_id_cache is not None else FileIdCache()
+        
+        # Recognise embedded artwork whose higher resolution version was already sent
+        self.cover_index = cover_index if cover_index is not None else CoverIndex()
+        
+        # Compare the artwork of duplicate results before picking one to send
+        self.scorer = QualityScorer()
+        self.client = client or DownloadClient()
     
     async def handle_audio_file(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """
@@ -117,16 +157,35 @@ class AudioHandler:
             else:
                 file_name += ".ogg"  # Voice messages are usually OGG
             
-            # Download file
-            file_path = os.path.join(self.audio_processor.temp_dir, file_name)
-            await file.download_to_drive(file_path)
+            # Files served over HTTP are streamed while parsing, others are downloaded
+            # first, into memory unless they are too large to hold there
+            file_size = audio.file_size or file.file_size
+            streamed = (file.file_path or "").startswith(("http://", "https://"))
+            audio_file = None
+            if not streamed and file_size is not None and file_size <= AUDIO_MEMORY_MAX_BYTES:
+                audio_file = BytesIO()
+                await file.download_to_memory(audio_file)
+            elif not streamed:
+                audio_file = os.path.join(self.audio_processor.temp_dir, file_name)
+                await file.download_to_drive(audio_file)
             
             # Process the audio file
             await processing_message.edit_text(
                 _("🔍 جاري استخراج الغلاف والبيانات الوصفية...")
             )
             
-            result = await self.audio_processor.process_audio_file(file_path)
+            try:
+                if streamed:
+                    # The download stops as soon as the tags and pictures have arrived
+                    result = await self.audio_processor.process_audio_stream(
+                        self.client.iter_chunks(file.file_path, AUDIO_STREAM_CHUNK_BYTES, AUDIO_STREAM_TIMEOUT),
+                        file_name, file_size
+                    )
+                else:
+                    result = await self.audio_processor.process_audio_file(audio_file, file_name)
+            finally:
+                if isinstance(audio_file, str):
+                    os.unlink(audio_file)
             
             if not result["success"]:
                 await processing_message.edit_text(
@@ -137,7 +196,10 @@ class AudioHandler:
                 return
             
             # Check if cover was extracted
-            if result["cover_path"]:
+            if result["cover_data"]:
+                # Hash the cover once for the file ID cache and the cover index
+                cover = await asyncio.to_thread(self._identify_cover, result["cover_data"])
+                
                 # Log cover extraction if database is available
                 if self.database:
                     self.database.log_interaction("cover_extracted", {
@@ -154,19 +216,31 @@ class AudioHandler:
                     )
                     
                     # Send cover image
-                    with open(result["cover_path"], 'rb') as cover_file:
-                        await context.bot.send_photo(
-                            chat_id=chat_id,
-                            photo=cover_file,
-                            caption=_("🎵 غلاف الأغنية: {title}\n👤 الفنان: {artist}\n💿 الألبوم: {album}").format(
-                                title=result["metadata"].get("title", _("غير معروف")),
-                                artist=result["metadata"].get("artist", _("غير معروف")),
-                                album=result["metadata"].get("album", _("غير معروف"))
-                            )
+                    await self._send_extracted_cover(
+                        chat_id, result["cover_data"], cover, context,
+                        caption=_("🎵 غلاف الأغنية: {title}\n👤 الفنان: {artist}\n💿 الألبوم: {album}").format(
+                            title=result["metadata"].get("title", _("غير معروف")),
+                            artist=result["metadata"].get("artist", _("غير معروف")),
+                            album=result["metadata"].get("album", _("غير معروف"))
                         )
+                    )
                     
                     return
                 
+                # The same artwork may already be known in a higher resolution
+                if await self._send_known_upgrade(
+                    chat_id, cover, context,
+                    caption=_("🎵 غلاف الأغنية: {title}\n👤 الفنان: {artist}\n💿 الألبوم: {album}").format(
+                        title=result["metadata"].get("title", _("غير معروف")),
+                        artist=result["metadata"].get("artist", _("غير معروف")),
+                        album=result["metadata"].get("album", _("غير معروف"))
+                    )
+                ):
+                    await processing_message.edit_text(
+                        _("✅ تم العثور على نسخة بدقة أعلى من غلاف الأغنية!")
+                    )
+                    return
+                
                 # If cover quality is medium or low, offer to search for better quality
                 await processing_message.edit_text(
                     _("🔍 تم استخراج غلاف الأغنية بجودة {quality}. هل تريد البحث عن غلاف بجودة أعلى؟").format(
@@ -175,37 +249,35 @@ class AudioHandler:
                 )
                 
                 # Send extracted cover with buttons
-                with open(result["cover_path"], 'rb') as cover_file:
-                    # Create keyboard with search options
-                    keyboard = [
-                        [
-                            InlineKeyboardButton(
-                                _("🔍 بحث عن غلاف بجودة أعلى"),
-                                callback_data=f"search_better_cover:{audio.file_id}"
-                            )
-                        ],
-                        [
-                            InlineKeyboardButton(
-                                _("✅ استخدام هذا الغلاف"),
-                                callback_data=f"use_extracted_cover:{audio.file_id}"
-                            )
-                        ]
+                # Create keyboard with search options
+                keyboard = [
+                    [
+                        InlineKeyboardButton(
+                            _("🔍 بحث عن غلاف بجودة أعلى"),
+                            callback_data=f"search_better_cover:{audio.file_id}"
+                        )
+                    ],
+                    [
+                        InlineKeyboardButton(
+                            _("✅ استخدام هذا الغلاف"),
+                            callback_data=f"use_extracted_cover:{audio.file_id}"
+                        )
                     ]
+                ]
                     
-                    # Store metadata in user data for later use
-                    context.user_data['audio_metadata'] = result["metadata"]
-                    context.user_data['audio_file_id'] = audio.file_id
+                # Store metadata in user data for later use
+                context.user_data['audio_metadata'] = result["metadata"]
+                context.user_data['audio_file_id'] = audio.file_id
                     
-                    await context.bot.send_photo(
-                        chat_id=chat_id,
-                        photo=cover_file,
-                        caption=_("🎵 غلاف الأغنية: {title}\n👤 الفنان: {artist}\n💿 الألبوم: {album}").format(
-                            title=result["metadata"].get("title", _("غير معروف")),
-                            artist=result["metadata"].get("artist", _("غير معروف")),
-                            album=result["metadata"].get("album", _("غير معروف"))
-                        ),
-                        reply_markup=InlineKeyboardMarkup(keyboard)
-                    )
+                await self._send_extracted_cover(
+                    chat_id, result["cover_data"], cover, context,
+                    caption=_("🎵 غلاف الأغنية: {title}\n👤 الفنان: {artist}\n💿 الألبوم: {album}").format(
+                        title=result["metadata"].get("title", _("غير معروف")),
+                        artist=result["metadata"].get("artist", _("غير معروف")),
+                        album=result["metadata"].get("album", _("غير معروف"))
+                    ),
+                    reply_markup=InlineKeyboardMarkup(keyboard)
+                )
                 
             else:
                 # No cover found, try to search based on metadata
@@ -407,6 +479,175 @@ class AudioHandler:
         
         return False
     
+    async def _send_extracted_cover(self, chat_id: int, cover_data: bytes, cover: CoverIdentity,
+                                    context: ContextTypes.DEFAULT_TYPE,
+                                    caption: str,
+                                    reply_markup: Optional[InlineKeyboardMarkup] = None) -> None:
+        """
+        Send a cover extracted from an audio file.
+        
+        Covers are identified by a hash of their bytes, so the same embedded
+        artwork sent by different users is uploaded only once.
+        
+        Args:
+            chat_id: Chat ID to send the cover to
+            cover_data: Extracted cover image bytes
+            cover: Identity of the cover, from _identify_cover
+            context: The context object from Telegram
+            caption: Photo caption
+            reply_markup: Inline keyboard (optional)
+        """
+        source, cover_hash, width, height = cover
+        cached = self.file_id_cache.get(source, "extracted")
+        
+        if cached:
+            try:
+                await context.bot.send_photo(
+                    chat_id=chat_id,
+                    photo=cached[0],
+                    caption=caption,
+                    reply_markup=reply_markup
+                )
+                return
+            except BadRequest as e:
+                logger.warning(f"Cached file ID for {source} was rejected: {e}")
+                self.file_id_cache.invalidate(source, "extracted")
+        
+        message = await context.bot.send_photo(
+            chat_id=chat_id,
+            photo=BytesIO(cover_data),
+            caption=caption,
+            reply_markup=reply_markup
+        )
+        self.file_id_cache.set_from_message(source, "extracted", message, width, height)
+        self.cover_index.add(cover_hash, source, "extracted", width, height)
+    
+    @staticmethod
+    def _identify_cover(cover_data: bytes) -> CoverIdentity:
+        """
+        Compute the content hash, perceptual hash and size of a cover.
+        
+        Args:
+            cover_data: Encoded cover image
+        
+        Returns:
+            Tuple of (content hash source, difference hash, width, height)
+        """
+        image = Image.open(BytesIO(cover_data))
+        width, height = image.size
+        return f"sha256:{hashlib.sha256(cover_data).hexdigest()}", dhash(image), width, height
+    
+    async def _send_known_upgrade(self, chat_id: int, cover: CoverIdentity,
+                                  context: ContextTypes.DEFAULT_TYPE,
+                                  caption: str) -> bool:
+        """
+        Send the largest known version of an extracted cover, if it is larger.
+        
+        Args:
+            chat_id: Chat ID to send the cover to
+            cover: Identity of the extracted cover, from _identify_cover
+            context: The context object from Telegram
+            caption: Photo caption
+        
+        Returns:
+            True if a larger version was sent, False if none is known
+        """
+        _, cover_hash, width, _ = cover
+        matches = [
+            match for match in self.cover_index.find(cover_hash)
+            if match["rendition"] == "photo" and (match["width"] or 0) > width
+        ]
+        matches.sort(key=lambda match: match["width"], reverse=True)
+        
+        for match in matches:
+            cached = self.file_id_cache.get(match["source"], "photo")
+            photo = cached[0] if cached else match["url"]
+            if not photo:
+                continue
+            
+            try:
+                await context.bot.send_photo(chat_id=chat_id, photo=photo, caption=caption)
+                return True
+            except BadRequest as e:
+                logger.warning(f"Known version {match['source']} of extracted cover was rejected: {e}")
+                if cached:
+                    self.file_id_cache.invalidate(match["source"], "photo")
+        
+        return False
+    
+    async def _pick_best_result(self, results: List[Any]) -> Any:
+        """
+        Pick the result with the best artwork among duplicates of the top result.
+        
+        Singles, albums and special editions often share title and artist but
+        carry different artwork. Their artwork is downloaded concurrently at a
+        moderate size and scored in one batch, so an upscaled or heavily
+        compressed cover is not sent when a cleaner one exists.
+        
+        Args:
+            results: Search results, best match first
+        
+        Returns:
+            The chosen result
+        """
+        top = results[0]
+        
+        def identity(item: Any) -> tuple:
+            return (str(item.get('title', '')).casefold(), str(item.get('artist', '')).casefold())
+        
+        duplicates = [
+            item for item in results
+            if hasattr(item, "artwork_url") and identity(item) == identity(top)
+        ][:QUALITY_MAX_CANDIDATES]
+        
+        if len(duplicates) < 2:
+            return top
+        
+        downloads = await asyncio.gather(*(
+            self._download_candidate(item.artwork_url(QUALITY_CANDIDATE_SIZE)) for item in duplicates
+        ))
+        candidates = [(item, image_data) for item, image_data in zip(duplicates, downloads) if image_data]
+        
+        if len(candidates) < 2:
+            return top
+        
+        best = await asyncio.to_thread(self.scorer.best, [image_data for _, image_data in candidates])
+        
+        if best is None:
+            return top
+        
+        if candidates[best][0] is not top:
+            logger.info(f"Using result {results.index(candidates[best][0])} instead of 0 for its better artwork")
+        
+        return candidates[best][0]
+    
+    async def _download_candidate(self, url: str) -> Optional[bytes]:
+        """
+        Download the artwork of a candidate result on the pooled session.
+        
+        Args:
+            url: Artwork URL
+        
+        Returns:
+            Image bytes or None if the download failed or the image was rejected
+        """
+        try:
+            timeout = aiohttp.ClientTimeout(total=ARTWORK_FETCH_TIMEOUT)
+            async with self.client.get_session().get(url, timeout=timeout) as response:
+                if response.status != 200:
+                    return None
+                
+                reader = ImageStreamReader(declared_size=response.content_length or 0)
+                if reader.error is None:
+                    async for chunk in response.content.iter_chunked(16384):
+                        if not reader.feed(chunk):
+                            break
+                
+                return reader.finish()[0]
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Error downloading candidate artwork {url}: {e}")
+            return None
+    
     async def _search_and_send_cover(self, 
                                     search_query: str, 
                                     chat_id: int, 
@@ -426,16 +667,19 @@ class AudioHandler:
             _: Translation function
         """
         try:
+            # Tags in non-Latin scripts are searched in matching regional storefronts
+            countries = select_storefronts(search_query)
+            
             # Search for song
-            results = await self.itunes_api.search_song(search_query)
+            results = await self.itunes_api.search_song(search_query, countries)
             
             if not results:
                 # Try artist search
-                results = await self.itunes_api.search_artist(search_query)
+                results = await self.itunes_api.search_artist(search_query, countries)
             
             if not results:
                 # Try album search
-                results = await self.itunes_api.search_album(search_query)
+                results = await self.itunes_api.search_album(search_query, countries)
             
             if not results or len(results) == 0:
                 await context.bot.send_message(
@@ -446,11 +690,11 @@ class AudioHandler:
                 )
                 return
             
-            # Get the first result
-            result = results[0]
+            # Get the first result, or a duplicate of it with better artwork
+            result = await self._pick_best_result(results)
             
             # Get high quality cover
-            cover_url = self.itunes_api.get_high_quality_artwork_url(result['artworkUrl100'])
+            cover_url = self.itunes_api.get_cover_url(result, high_quality=True)
             
             # Log search if database is available
             if self.database:
@@ -460,24 +704,35 @@ class AudioHandler:
                 )
                 
                 self.database.log_result(
-                    search_query, "audio_cover", results, 0, user.id, user_data,
+                    search_query, "audio_cover", results, results.index(result), user.id, user_data,
                     chat_id if chat_id != user.id else None
                 )
             
-            # Send cover
-            await context.bot.send_photo(
-                chat_id=chat_id,
-                photo=cover_url,
-                caption=_("🎵 تم العثور على غلاف بجودة عالية:\n\n"
-                         "🎵 العنوان: {title}\n"
-                         "👤 الفنان: {artist}\n"
-                         "💿 الألبوم: {album}").format(
-                    title=result.get('trackName', result.get('collectionName', _("غير معروف"))),
-                    artist=result.get('artistName', _("غير معروف")),
-                    album=result.get('collectionName', _("غير معروف"))
-                )
+            caption = _("🎵 تم العثور على غلاف بجودة عالية:\n\n"
+                        "🎵 العنوان: {title}\n"
+                        "👤 الفنان: {artist}\n"
+                        "💿 الألبوم: {album}").format(
+                title=result.get('title', _("غير معروف")),
+                artist=result.get('artist', _("غير معروف")),
+                album=result.get('album', _("غير معروف"))
             )
             
+            # Send cover, by file ID if Telegram already fetched it before
+            source = f"collection:{result.get('collection_id')}" if result.get('collection_id') else cover_url
+            cached = self.file_id_cache.get(source, "url")
+            message = None
+            
+            if cached:
+                try:
+                    message = await context.bot.send_photo(chat_id=chat_id, photo=cached[0], caption=caption)
+                except BadRequest as e:
+                    logger.warning(f"Cached file ID for {source} was rejected: {e}")
+                    self.file_id_cache.invalidate(source, "url")
+            
+            if message is None:
+                message = await context.bot.send_photo(chat_id=chat_id, photo=cover_url, caption=caption)
+                self.file_id_cache.set_from_message(source, "url", message, url=cover_url)
+            
             # Log image if database is available
             if self.database:
                 self.database.log_image(
@@ -489,6 +744,12 @@ class AudioHandler:
                     chat_id if chat_id != user.id else None
                 )
             
+        except APIBusyError:
+            await context.bot.send_message(
+                chat_id=chat_id,
+                text=_("⏳ الخدمة مشغولة حالياً بسبب كثرة الطلبات. الرجاء المحاولة بعد قليل.")
+            )
+            
         except Exception as e:
             logger.error(f"Error searching for cover: {e}")
             
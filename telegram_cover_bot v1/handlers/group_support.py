@@ -5,21 +5,28 @@ This module enhances the bot's functionality in group chats.
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, Message
 from telegram.ext import ContextTypes
 from typing import Optional, List, Dict, Any, Tuple
+import time
 
+from api.base import MusicAPI
+from api.itunes import iTunesAPI
+from api.rate_limiter import APIBusyError
+from api.storefronts import select_storefronts
 from utils.session import SessionManager
 
 
 class GroupSupportHandler:
     """Handler for group-specific functionality."""
     
-    def __init__(self, session_manager: SessionManager):
+    def __init__(self, session_manager: SessionManager, api: Optional[MusicAPI] = None):
         """
         Initialize the group support handler.
         
         Args:
             session_manager: Session manager instance
+            api: Shared music API client (optional, a new iTunes client is created if omitted)
         """
         self.session_manager = session_manager
+        self.api = api or iTunesAPI()
         self.group_sessions = {}  # Store group-specific data
     
     async def handle_group_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -301,9 +308,7 @@ class GroupSupportHandler:
         await query.answer("تم إنهاء التصويت وبدء البحث.")
         
         # Trigger the search
-        # This would typically call your existing search functionality
-        # For now, we'll just simulate it
-        await self._simulate_search_results(context, chat_id)
+        await self._perform_group_search(context, chat_id)
     
     async def _handle_select_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE, index: int) -> None:
         """
@@ -437,9 +442,9 @@ class GroupSupportHandler:
         
         return winning_type, winning_count
     
-    async def _simulate_search_results(self, context: ContextTypes.DEFAULT_TYPE, chat_id: int) -> None:
+    async def _perform_group_search(self, context: ContextTypes.DEFAULT_TYPE, chat_id: int) -> None:
         """
-        Simulate search results for demonstration purposes.
+        Run the voted search against the music API and show the results.
         
         Args:
             context: The context object from Telegram
@@ -448,27 +453,27 @@ class GroupSupportHandler:
         # Get poll information
         poll = self.group_sessions[chat_id]['current_poll']
         
-        # Simulate some results
-        results = [
-            {
-                'title': f"نتيجة 1 لـ {poll['query']}",
-                'artist': 'فنان 1',
-                'album': 'ألبوم 1',
-                'cover_url': 'https://example.com/cover1.jpg'
-            },
-            {
-                'title': f"نتيجة 2 لـ {poll['query']}",
-                'artist': 'فنان 2',
-                'album': 'ألبوم 2',
-                'cover_url': 'https://example.com/cover2.jpg'
-            },
-            {
-                'title': f"نتيجة 3 لـ {poll['query']}",
-                'artist': 'فنان 3',
-                'album': 'ألبوم 3',
-                'cover_url': 'https://example.com/cover3.jpg'
-            }
-        ]
+        # Perform search based on the winning type
+        results = []
+        countries = select_storefronts(poll['query'])
+        try:
+            if poll['search_type'] == 'song':
+                results = await self.api.search_song(poll['query'], countries)
+            elif poll['search_type'] == 'artist':
+                results = await self.api.search_artist(poll['query'], countries)
+            elif poll['search_type'] == 'album':
+                results = await self.api.search_album(poll['query'], countries)
+        except APIBusyError:
+            # Reopen voting so the initiator can retry the search
+            poll['status'] = 'voting'
+            await context.bot.edit_message_text(
+                chat_id=chat_id,
+                message_id=poll['message_id'],
+                text=f"🔍 بحث جماعي: \"{poll['query']}\"\n\n"
+                    f"الخدمة مشغولة حالياً بسبب كثرة الطلبات. الرجاء المحاولة بعد قليل.",
+                reply_markup=self._create_search_type_keyboard()
+            )
+            return
         
         # Update poll with results
         poll['status'] = 'completed'
@@ -479,7 +484,7 @@ class GroupSupportHandler:
             'query': poll['query'],
             'search_type': poll['search_type'],
             'count': len(results),
-            'timestamp': context.bot.get_updates()[-1].message.date.timestamp() if context.bot.get_updates() else 0
+            'timestamp': time.time()
         })
         
         # Create results keyboard
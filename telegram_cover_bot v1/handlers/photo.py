@@ -0,0 +1,108 @@
+"""
+Photo handler for the Telegram Cover Bot.
+This module answers pictures sent by users with the highest resolution
+version of the same cover the bot already knows.
+"""
+from telegram import Update
+from telegram.ext import ContextTypes
+from telegram.error import BadRequest
+import asyncio
+import logging
+from typing import Optional
+
+from utils.session import SessionManager
+from utils.translation import TranslationManager
+from utils.database import InteractionDatabase
+from utils.file_id_cache import FileIdCache
+from utils.cover_index import CoverIndex, dhash
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+class PhotoHandler:
+    """Handler for reverse cover lookup from photos sent by users."""
+    
+    def __init__(self,
+                session_manager: SessionManager,
+                translation_manager: TranslationManager,
+                database: Optional[InteractionDatabase] = None,
+                cover_index: Optional[CoverIndex] = None,
+                file_id_cache: Optional[FileIdCache] = None):
+        """
+        Initialize the photo handler.
+        
+        Args:
+            session_manager: Session manager instance
+            translation_manager: Translation manager instance
+            database: Interaction database instance (optional)
+            cover_index: Shared perceptual cover index (optional, a memory-only index is created if omitted)
+            file_id_cache: Shared Telegram file ID cache (optional, a memory-only cache is created if omitted)
+        """
+        self.session_manager = session_manager
+        self.translation_manager = translation_manager
+        self.database = database
+        self.cover_index = cover_index if cover_index is not None else CoverIndex()
+        self.file_id_cache = file_id_cache if file_id_cache is not None else FileIdCache()
+    
+    async def handle_photo(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """
+        Handle photos sent by users.
+        
+        Args:
+            update: The update object from Telegram
+            context: The context object from Telegram
+        """
+        user = update.effective_user
+        chat_id = update.effective_chat.id
+        message = update.message
+        user_lang = self.translation_manager.get_user_language(user.id)
+        
+        # Log interaction if database is available
+        if self.database:
+            user_data = {
+                'username': user.username,
+                'first_name': user.first_name,
+                'last_name': user.last_name
+            }
+            self.database.log_interaction("photo", {
+                "file_id": message.photo[-1].file_id,
+                "user": user_data
+            }, user.id, chat_id if update.effective_chat.type != "private" else None)
+        
+        # The smallest size Telegram keeps is enough for the 9x8 hash grid
+        file = await context.bot.get_file(message.photo[0].file_id)
+        photo_data = bytes(await file.download_as_bytearray())
+        photo_hash = await asyncio.to_thread(dhash, photo_data)
+        
+        # Only versions larger than the largest size the user sent are worth returning
+        sent_width = message.photo[-1].width
+        matches = [
+            match for match in self.cover_index.find(photo_hash)
+            if match["rendition"] == "photo" and (match["width"] or 0) > sent_width
+        ]
+        matches.sort(key=lambda match: match["width"], reverse=True)
+        
+        for match in matches:
+            cached = self.file_id_cache.get(match["source"], "photo")
+            photo = cached[0] if cached else match["url"]
+            if not photo:
+                continue
+            
+            try:
+                await message.reply_photo(
+                    photo=photo,
+                    caption=self.translation_manager.get_text(
+                        'higher_resolution_found', user_lang, width=match["width"], height=match["height"]
+                    )
+                )
+                return
+            except BadRequest as e:
+                logger.warning(f"Known version {match['source']} of sent photo was rejected: {e}")
+                if cached:
+                    self.file_id_cache.invalidate(match["source"], "photo")
+        
+        await message.reply_text(self.translation_manager.get_text('no_higher_resolution', user_lang))
@@ -3,17 +3,40 @@ Updated search handler with multilanguage support, analytics, and social sharing
 """
 from telegram import Update, InputMediaPhoto, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes
+from telegram.error import BadRequest
+import asyncio
+import logging
 from io import BytesIO
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
 
+from api.artwork import ArtworkResolver
+from api.cache import TTLCache
+from api.base import MusicAPI
 from api.itunes import iTunesAPI
+from api.models import CoverResult
+from api.rate_limiter import APIBusyError
+from api.storefronts import select_storefronts
+from config import MIN_IMAGE_DIMENSION, PREFETCH_TOP_K, ARTWORK_CACHE_REFRESH_INTERVAL, ARTWORK_RESOLVER_MAX_ENTRIES
 from utils.image_processor import ImageProcessor
 from utils.session import SessionManager
 from utils.translation import TranslationManager
 from utils.analytics import AnalyticsManager
 from utils.social_sharing import SocialSharingManager
+from utils.artwork_cache import ArtworkCache
+from utils.file_id_cache import FileIdCache
+from utils.cover_index import CoverIndex
+from utils.hedged_fetch import FetchResult, HedgedFetcher
+from utils.image_executor import ImageExecutor
+from utils.prefetch import Prefetcher
+from utils.single_flight import SingleFlight
 from .commands import create_results_keyboard
 
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
 
 class SearchHandler:
     """Handler for search-related functionality."""
@@ -21,7 +44,15 @@ class SearchHandler:
     def __init__(self, session_manager: SessionManager, 
                 translation_manager: TranslationManager = None,
                 analytics_manager: AnalyticsManager = None,
-                social_sharing_manager: SocialSharingManager = None):
+                social_sharing_manager: SocialSharingManager = None,
+                api: MusicAPI = None,
+                artwork_resolver: ArtworkResolver = None,
+                file_id_cache: FileIdCache = None,
+                image_executor: ImageExecutor = None,
+                fetcher: HedgedFetcher = None,
+                cover_index: CoverIndex = None,
+                artwork_cache: ArtworkCache = None,
+                prefetcher: Prefetcher = None):
         """
         Initialize the search handler.
         
@@ -30,14 +61,32 @@ class SearchHandler:
             translation_manager: Translation manager instance (optional)
             analytics_manager: Analytics manager instance (optional)
             social_sharing_manager: Social sharing manager instance (optional)
+            api: Shared music API client (optional, a new iTunes client is created if omitted)
+            artwork_resolver: Shared artwork resolver (optional, a new resolver is created if omitted)
+            file_id_cache: Shared Telegram file ID cache (optional, a memory-only cache is created if omitted)
+            image_executor: Shared image processing pool (optional, a new pool is created if omitted)
+            fetcher: Shared artwork downloader (optional, a new downloader is created if omitted)
+            cover_index: Shared perceptual cover index (optional, a memory-only index is created if omitted)
+            artwork_cache: Shared artwork disk cache (optional, downloads are not cached if omitted)
+            prefetcher: Background cover prefetcher (optional, a new prefetcher is created if omitted)
         """
-        self.api = iTunesAPI()
+        self.api = api or iTunesAPI()
+        self.artwork_resolver = artwork_resolver or ArtworkResolver()
+        self.file_id_cache = file_id_cache if file_id_cache is not None else FileIdCache()
         self.image_processor = ImageProcessor()
+        self.image_executor = image_executor or ImageExecutor()
+        self.fetcher = fetcher or HedgedFetcher()
+        self.cover_index = cover_index if cover_index is not None else CoverIndex()
+        self.artwork_cache = artwork_cache
+        self.prefetcher = prefetcher or Prefetcher()
         self.session_manager = session_manager
         self.translation_manager = translation_manager
         self.analytics_manager = analytics_manager
         self.social_sharing_manager = social_sharing_manager
         self.page_size = 5  # Number of results per page
+        self.downloads = SingleFlight()  # Coalesces concurrent downloads of the same artwork
+        self.refreshed = TTLCache(ARTWORK_RESOLVER_MAX_ENTRIES)  # Ladders recently downloaded again for their best size
+        self._refreshes: Set[asyncio.Task] = set()
     
     async def handle_text_search(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """
@@ -202,6 +251,9 @@ class SearchHandler:
                 reply_markup=keyboard
             )
             await query.answer()
+            
+            # Prepare the covers of the page now shown instead of the one left
+            self._prefetch_page(user_id, results, index)
             return
             
         # Handle selection
@@ -227,6 +279,9 @@ class SearchHandler:
                     user_lang
                 )
                 
+                # The results keyboard is removed below, covers still being prefetched are not needed
+                self.prefetcher.cancel(user_id)
+                
                 # Record successful search in analytics
                 if self.analytics_manager:
                     search_type = session.get('last_search_type', 'song')
@@ -271,6 +326,9 @@ class SearchHandler:
         if self.translation_manager:
             user_lang = self.translation_manager.get_user_language(user_id)
         
+        # A new search replaces the results whose covers were being prefetched
+        self.prefetcher.cancel(user_id)
+        
         # Store search in session
         self.session_manager.add_recent_search(user_id, query, search_type)
         
@@ -281,12 +339,23 @@ class SearchHandler:
         
         # Perform search based on type
         results = []
-        if search_type == "song":
-            results = self.api.search_song(query)
-        elif search_type == "artist":
-            results = self.api.search_artist(query)
-        elif search_type == "album":
-            results = self.api.search_album(query)
+        countries = select_storefronts(query, user_lang)
+        try:
+            if search_type == "song":
+                results = await self.api.search_song(query, countries)
+            elif search_type == "artist":
+                results = await self.api.search_artist(query, countries)
+            elif search_type == "album":
+                results = await self.api.search_album(query, countries)
+        except APIBusyError:
+            # Use translation if available
+            if self.translation_manager and user_lang:
+                message = self.translation_manager.get_text('api_busy', user_lang)
+            else:
+                message = "الخدمة مشغولة حالياً بسبب كثرة الطلبات. الرجاء المحاولة بعد قليل."
+                
+            await update.message.reply_text(message)
+            return
         
         # Store results in session
         session['current_results'] = results
@@ -336,6 +405,153 @@ class SearchHandler:
             message,
             reply_markup=keyboard
         )
+        
+        # Prepare the top covers while the user reads the list
+        self._prefetch_page(user_id, results, 0)
+    
+    def _prefetch_page(self, user_id: int, results: List[Dict[str, Any]], index: int) -> None:
+        """
+        Start preparing the first covers of a results page in the background.
+        
+        Args:
+            user_id: Telegram user ID
+            results: Search results
+            index: Index of the first result on the page
+        """
+        page = results[index:index + min(self.page_size, PREFETCH_TOP_K)]
+        self.prefetcher.schedule(user_id, [
+            (self._prefetch_key(item), lambda item=item: self._prefetch_cover(item))
+            for item in page
+        ])
+    
+    @staticmethod
+    def _prefetch_key(item: Dict[str, Any]) -> Any:
+        """Get the key a result's prefetched cover is stored under."""
+        return item.get('collection_id') or item.get('cover_url')
+    
+    async def _prefetch_cover(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Download and prepare a result's cover ahead of its selection.
+        
+        Args:
+            item: Item containing cover URL
+        
+        Returns:
+            Prepared cover as returned by _load_cover, or None if the cover
+            has no URL, is invalid or can already be sent by file ID
+        """
+        if item.get('collection_id') and self.file_id_cache.has(f"collection:{item.get('collection_id')}", "photo"):
+            return None
+        
+        cover_urls = await self._resolve_cover_urls(item)
+        if not cover_urls[0]:
+            return None
+        if not item.get('collection_id') and self.file_id_cache.has(cover_urls[0], "photo"):
+            return None
+        
+        # Failed covers are not kept, so the selection tries again
+        cover = await self._load_cover(cover_urls)
+        return cover if cover["is_valid"] else None
+    
+    async def _resolve_cover_urls(self, item: Dict[str, Any]) -> List[Optional[str]]:
+        """
+        Get the artwork sizes available for a result.
+        
+        Args:
+            item: Item containing cover URL
+        
+        Returns:
+            Artwork URLs, largest first (None if the result has no artwork)
+        """
+        if isinstance(item, CoverResult):
+            return await self.artwork_resolver.resolve_ladder(item)
+        return [
+            self.api.get_cover_url(item, high_quality=True),
+            self.api.get_cover_url(item, high_quality=False)
+        ]
+    
+    async def _load_cover(self, cover_urls: List[str]) -> Dict[str, Any]:
+        """
+        Download, validate and prepare a cover for sending.
+        
+        Args:
+            cover_urls: Artwork URLs, largest first
+        
+        Returns:
+            Dictionary with urls, found (whether any size was downloaded),
+            is_valid, telegram_image, image_info, error, url (the size sent)
+            and cover_hash
+        """
+        # Download the largest size that arrives valid, hedging to smaller sizes when it is slow or missing
+        image_data, image_info, error, fetched_url = await self._fetch_cover(cover_urls)
+        cover = {
+            "urls": cover_urls,
+            "found": image_data is not None or image_info is not None,
+            "is_valid": False,
+            "telegram_image": None,
+            "image_info": image_info,
+            "error": error,
+            "url": cover_urls[0],
+            "cover_hash": None
+        }
+        
+        if image_data is None:
+            return cover
+        
+        # Validate and prepare the image off the event loop, decoding it once
+        is_valid, telegram_image, image_info, error = await self.image_executor.process_for_telegram(image_data)
+        cover.update(is_valid=is_valid, telegram_image=telegram_image, image_info=image_info, error=error, url=fetched_url)
+        
+        if is_valid:
+            cover["cover_hash"] = await self.image_executor.dhash(image_data)
+        
+        return cover
+    
+    async def _fetch_cover(self, urls: List[str]) -> FetchResult:
+        """
+        Download artwork from a ladder of sizes, sharing in-flight fetches of the same ladder.
+        
+        Artwork downloaded before is read from the disk cache instead. When
+        only a smaller size is cached, e.g. because the best size timed out
+        once, it is served and the ladder is downloaded again in the background.
+        
+        Args:
+            urls: Artwork URLs, largest first
+            
+        Returns:
+            Tuple of (image_bytes, image_info, error_message, url)
+        """
+        if self.artwork_cache is not None:
+            image_data, url = await asyncio.to_thread(self.artwork_cache.get_first, urls)
+            if image_data is not None:
+                if url != urls[0]:
+                    self._refresh_cover(urls)
+                return image_data, None, None, url
+        
+        return await self.downloads.do(tuple(urls), lambda: self._download_cover(urls))
+    
+    async def _download_cover(self, urls: List[str]) -> FetchResult:
+        """Download artwork from a ladder of sizes and store it in the disk cache."""
+        result = await self.fetcher.fetch(urls, MIN_IMAGE_DIMENSION)
+        if result[0] is not None and self.artwork_cache is not None:
+            await asyncio.to_thread(self.artwork_cache.put, result[3], result[0])
+        return result
+    
+    def _refresh_cover(self, urls: List[str]) -> None:
+        """Download a ladder again in the background, at most once per refresh interval."""
+        if urls[0] in self.refreshed:
+            return
+        
+        self.refreshed.set(urls[0], True, ARTWORK_CACHE_REFRESH_INTERVAL)
+        task = asyncio.create_task(self.downloads.do(tuple(urls), lambda: self._download_cover(urls)))
+        self._refreshes.add(task)
+        task.add_done_callback(self._refresh_done)
+    
+    def _refresh_done(self, task: asyncio.Task) -> None:
+        """Forget a finished background download and log its failure."""
+        self._refreshes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Artwork refresh failed: {task.exception()}")
     
     async def _send_cover_image(self, chat_id: int, item: Dict[str, Any], 
                                context: ContextTypes.DEFAULT_TYPE,
@@ -349,8 +565,17 @@ class SearchHandler:
             context: The context object from Telegram
             user_lang: User language code (optional)
         """
-        # Get high quality cover URL
-        cover_url = self.api.get_cover_url(item, high_quality=True)
+        # Covers sent before are re-sent by file ID without downloading or uploading
+        source = f"collection:{item.get('collection_id')}" if item.get('collection_id') else None
+        if source and await self._send_cached_cover(chat_id, item, source, context, user_lang):
+            return
+        
+        # Covers prefetched while the results keyboard was shown are ready to send
+        cover = await self.prefetcher.take(self._prefetch_key(item))
+        
+        # Get the artwork sizes available for this collection, largest first
+        cover_urls = cover["urls"] if cover else await self._resolve_cover_urls(item)
+        cover_url = cover_urls[0]
         
         if not cover_url:
             # Use translation if available
@@ -364,11 +589,17 @@ class SearchHandler:
                 text=message
             )
             return
+        
+        # Results without a collection are identified by their cover URL
+        if not source:
+            source = cover_url
+            if await self._send_cached_cover(chat_id, item, source, context, user_lang):
+                return
             
-        # Download the image
-        image_data = self.image_processor.download_image(cover_url)
+        if cover is None:
+            cover = await self._load_cover(cover_urls)
         
-        if not image_data:
+        if not cover["found"]:
             # Use translation if available
             if self.translation_manager and user_lang:
                 message = self.translation_manager.get_text('error_loading', user_lang)
@@ -380,84 +611,157 @@ class SearchHandler:
                 text=message
             )
             return
-            
-        # Validate the image
-        is_valid, image_obj, error = self.image_processor.validate_image(image_data)
         
-        if not is_valid:
-            # Try with standard quality URL as fallback
-            cover_url = self.api.get_cover_url(item, high_quality=False)
-            image_data = self.image_processor.download_image(cover_url)
-            
-            if not image_data:
-                # Use translation if available
-                if self.translation_manager and user_lang:
-                    message = self.translation_manager.get_text('error_loading', user_lang)
-                else:
-                    message = "عذراً، حدث خطأ أثناء تحميل الغلاف."
-                    
-                await context.bot.send_message(
-                    chat_id=chat_id,
-                    text=message
-                )
-                return
+        image_info = cover["image_info"]
+        if not cover["is_valid"]:
+            # Use translation if available
+            if self.translation_manager and user_lang:
+                message = self.translation_manager.get_text('invalid_image', user_lang, error=cover["error"])
+            else:
+                message = f"عذراً، الصورة غير صالحة: {cover['error']}"
                 
-            is_valid, image_obj, error = self.image_processor.validate_image(image_data)
+            await context.bot.send_message(
+                chat_id=chat_id,
+                text=message
+            )
+            return
+        
+        # The same artwork may already be uploaded under another collection or URL
+        cover_url = cover["url"]
+        cover_hash = cover["cover_hash"]
+        if await self._send_duplicate_cover(chat_id, item, source, cover_hash, image_info['width'], context, user_lang):
+            return
+        
+        # Send the image and remember its file ID for repeat requests
+        message = await context.bot.send_photo(
+            chat_id=chat_id,
+            photo=cover["telegram_image"],
+            caption=self._build_caption(item, image_info['width'], image_info['height'], user_lang),
+            parse_mode="Markdown",
+            reply_markup=self._build_share_buttons(item, cover_url, user_lang)
+        )
+        self.file_id_cache.set_from_message(
+            source, "photo", message, image_info['width'], image_info['height'], cover_url
+        )
+        self.cover_index.add(cover_hash, source, "photo", image_info['width'], image_info['height'], cover_url)
+
+    async def _send_cached_cover(self, chat_id: int, item: Dict[str, Any], source: str,
+                                 context: ContextTypes.DEFAULT_TYPE,
+                                 user_lang: str = None) -> bool:
+        """
+        Send a previously uploaded cover by its Telegram file ID.
+        
+        Args:
+            chat_id: Telegram chat ID
+            item: Item the cover belongs to
+            source: Artwork identifier used as the cache key
+            context: The context object from Telegram
+            user_lang: User language code (optional)
+        
+        Returns:
+            True if the cover was sent, False if it is not cached or the file ID was rejected
+        """
+        cached = self.file_id_cache.get(source, "photo")
+        if not cached:
+            return False
+        
+        file_id, width, height, cover_url = cached
+        
+        try:
+            await context.bot.send_photo(
+                chat_id=chat_id,
+                photo=file_id,
+                caption=self._build_caption(item, width, height, user_lang),
+                parse_mode="Markdown",
+                reply_markup=self._build_share_buttons(item, cover_url, user_lang)
+            )
+            return True
+        except BadRequest as e:
+            # The file ID is stale, forget it and upload the cover again
+            logger.warning(f"Cached file ID for {source} was rejected: {e}")
+            self.file_id_cache.invalidate(source, "photo")
+            return False
+    
+    async def _send_duplicate_cover(self, chat_id: int, item: Dict[str, Any], source: str,
+                                    cover_hash: int, width: int,
+                                    context: ContextTypes.DEFAULT_TYPE,
+                                    user_lang: str = None) -> bool:
+        """
+        Send an uploaded near-identical cover instead of uploading this one.
+        
+        Args:
+            chat_id: Telegram chat ID
+            item: Item the cover belongs to
+            source: Artwork identifier of this cover
+            cover_hash: Perceptual hash of this cover
+            width: Width of this cover, the reused one must be at least as wide
+            context: The context object from Telegram
+            user_lang: User language code (optional)
+        
+        Returns:
+            True if a duplicate was sent, False if none is uploaded
+        """
+        for match in self.cover_index.find(cover_hash):
+            if match["source"] == source or match["rendition"] != "photo" or (match["width"] or 0) < width:
+                continue
             
-            if not is_valid:
-                # Use translation if available
-                if self.translation_manager and user_lang:
-                    message = self.translation_manager.get_text('invalid_image', user_lang, error=error)
-                else:
-                    message = f"عذراً، الصورة غير صالحة: {error}"
-                    
-                await context.bot.send_message(
-                    chat_id=chat_id,
-                    text=message
-                )
-                return
+            cached = self.file_id_cache.get(match["source"], "photo")
+            if cached and await self._send_cached_cover(chat_id, item, match["source"], context, user_lang):
+                # Serve this source from the same upload from now on
+                self.file_id_cache.set(source, "photo", *cached)
+                self.cover_index.add(cover_hash, source, "photo", cached[1], cached[2], cached[3])
+                return True
+        
+        return False
+    
+    def _build_caption(self, item: Dict[str, Any], width: int, height: int,
+                       user_lang: str = None) -> str:
+        """
+        Build the caption of a cover image.
         
-        # Prepare image for Telegram
-        telegram_image = self.image_processor.prepare_for_telegram(image_data)
+        Args:
+            item: Item the cover belongs to
+            width: Image width in pixels
+            height: Image height in pixels
+            user_lang: User language code (optional)
         
-        # Get image info for caption
-        image_info = self.image_processor.get_image_info(image_obj)
+        Returns:
+            Markdown caption
+        """
+        caption = f"🎵 *{item.get('title', 'Unknown')}*\n"
+        caption += f"👤 {item.get('artist', 'Unknown Artist')}\n"
+        
+        if 'album' in item:
+            caption += f"💿 {item.get('album', 'Unknown Album')}\n"
         
-        # Create caption
         if self.translation_manager and user_lang:
-            caption = f"🎵 *{item.get('title', 'Unknown')}*\n"
-            caption += f"👤 {item.get('artist', 'Unknown Artist')}\n"
-            
-            if 'album' in item:
-                caption += f"💿 {item.get('album', 'Unknown Album')}\n"
-                
-            caption += f"\n{self.translation_manager.get_text('image_quality', user_lang, width=image_info['width'], height=image_info['height'])}"
+            caption += f"\n{self.translation_manager.get_text('image_quality', user_lang, width=width, height=height)}"
         else:
-            caption = f"🎵 *{item.get('title', 'Unknown')}*\n"
-            caption += f"👤 {item.get('artist', 'Unknown Artist')}\n"
-            
-            if 'album' in item:
-                caption += f"💿 {item.get('album', 'Unknown Album')}\n"
-                
-            caption += f"\n📊 جودة الصورة: {image_info['width']}×{image_info['height']} بكسل"
-        
-        # Create share buttons if social sharing manager is available
-        reply_markup = None
-        if self.social_sharing_manager:
-            song_info = {
-                'title': item.get('title', 'Unknown'),
-                'artist': item.get('artist', 'Unknown Artist'),
-                'album': item.get('album', 'Unknown Album') if 'album' in item else None
-            }
-            reply_markup = self.social_sharing_manager.create_share_buttons_for_cover(
-                cover_url, song_info, user_lang
-            )
+            caption += f"\n📊 جودة الصورة: {width}×{height} بكسل"
         
-        # Send the image
-        await context.bot.send_photo(
-            chat_id=chat_id,
-            photo=telegram_image,
-            caption=caption,
-            parse_mode="Markdown",
-            reply_markup=reply_markup
+        return caption
+    
+    def _build_share_buttons(self, item: Dict[str, Any], cover_url: str,
+                             user_lang: str = None) -> Optional[InlineKeyboardMarkup]:
+        """
+        Build the share buttons of a cover image.
+        
+        Args:
+            item: Item the cover belongs to
+            cover_url: URL of the cover image
+            user_lang: User language code (optional)
+        
+        Returns:
+            Share buttons or None if social sharing is not available
+        """
+        if not self.social_sharing_manager:
+            return None
+        
+        song_info = {
+            'title': item.get('title', 'Unknown'),
+            'artist': item.get('artist', 'Unknown Artist'),
+            'album': item.get('album', 'Unknown Album') if 'album' in item else None
+        }
+        return self.social_sharing_manager.create_share_buttons_for_cover(
+            cover_url, song_info, user_lang
         )
@@ -0,0 +1,266 @@
+"""
+Artwork disk cache for the Telegram Cover Bot.
+This module keeps downloaded artwork bytes on disk, addressed by their
+content hash, so a cover requested again is read from disk instead of being
+downloaded again.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Set, Tuple
+
+from config import ARTWORK_CACHE_MAX_BYTES
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# Name of the SQLite index inside the cache directory
+INDEX_FILE = "index.sqlite3"
+
+
+class ArtworkCache:
+    """
+    Size-bounded, content-addressed LRU cache of artwork bytes.
+    
+    Each distinct image is stored once, under the SHA-256 of its bytes, and
+    any number of URLs may point to it (the same artwork is often served by
+    several storefronts). Files are written to a temporary name and renamed
+    into place, so a crash never leaves a partial image behind. The least
+    recently used images are evicted when the total size exceeds the budget.
+    
+    Methods touch the disk and are meant to be called through
+    ``asyncio.to_thread`` from handlers.
+    """
+    
+    def __init__(self, directory: str, max_bytes: int = ARTWORK_CACHE_MAX_BYTES):
+        """
+        Initialize the artwork cache.
+        
+        Args:
+            directory: Directory holding the cached images and their index
+            max_bytes: Maximum total size of the cached images in bytes
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._objects: "OrderedDict[str, int]" = OrderedDict()
+        self._urls: Dict[str, str] = {}
+        self._urls_by_digest: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, INDEX_FILE), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS objects (
+                digest TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        
+        # Load the index, oldest first so LRU order is preserved
+        for digest, size in self._conn.execute("SELECT digest, size FROM objects ORDER BY last_used ASC"):
+            self._objects[digest] = size
+            self.total_bytes += size
+        for url, digest in self._conn.execute("SELECT url, digest FROM urls"):
+            if digest in self._objects:
+                self._urls[url] = digest
+                self._urls_by_digest.setdefault(digest, set()).add(url)
+        
+        self._remove_orphans()
+    
+    def _path(self, digest: str) -> str:
+        """Get the file path of a cached image."""
+        return os.path.join(self.directory, digest[:2], digest)
+    
+    def _remove_orphans(self) -> None:
+        """Delete temporary files and images missing from the index, e.g. after a crash."""
+        for entry in os.scandir(self.directory):
+            if not entry.is_dir():
+                continue
+            for file in os.scandir(entry.path):
+                if file.name not in self._objects:
+                    try:
+                        os.unlink(file.path)
+                    except OSError as e:
+                        logger.warning(f"Could not remove orphaned artwork file {file.path}: {e}")
+    
+    def get(self, url: str) -> Optional[bytes]:
+        """
+        Get the cached artwork for a URL.
+        
+        Args:
+            url: Artwork URL
+        
+        Returns:
+            Image bytes or None if the URL is not cached
+        """
+        with self._lock:
+            digest = self._urls.get(url)
+            if digest is None:
+                self.misses += 1
+                return None
+            self._objects.move_to_end(digest)
+        
+        try:
+            with open(self._path(digest), "rb") as f:
+                data = f.read()
+        except OSError as e:
+            logger.warning(f"Cached artwork for {url} is unreadable: {e}")
+            with self._lock:
+                self._drop(digest)
+                self.misses += 1
+            return None
+        
+        with self._lock:
+            self.hits += 1
+            self._execute("UPDATE objects SET last_used = ? WHERE digest = ?", (time.time(), digest))
+        return data
+    
+    def get_first(self, urls: Sequence[str]) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        Get the cached artwork of the first cached URL in a ladder.
+        
+        Args:
+            urls: Artwork URLs, best first
+        
+        Returns:
+            Tuple of (image bytes, url), both None if no URL is cached
+        """
+        for url in urls:
+            if url in self._urls:
+                # get() counts the hit, or the miss if the file turned out unreadable
+                data = self.get(url)
+                if data is not None:
+                    return data, url
+                return None, None
+        
+        self.misses += 1
+        return None, None
+    
+    def put(self, url: str, data: bytes) -> None:
+        """
+        Store downloaded artwork.
+        
+        Args:
+            url: Artwork URL the bytes were downloaded from
+            data: Image bytes
+        """
+        if not data or len(data) > self.max_bytes:
+            return
+        
+        digest = hashlib.sha256(data).hexdigest()
+        
+        if digest not in self._objects:
+            path = self._path(digest)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(temp_path, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except OSError as e:
+                logger.error(f"Error writing artwork cache: {e}")
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
+                return
+        
+        with self._lock:
+            now = time.time()
+            if digest not in self._objects:
+                self._objects[digest] = len(data)
+                self.total_bytes += len(data)
+            self._objects.move_to_end(digest)
+            self._execute(
+                "INSERT OR REPLACE INTO objects (digest, size, last_used) VALUES (?, ?, ?)",
+                (digest, len(data), now)
+            )
+            
+            previous = self._urls.get(url)
+            if previous is not None and previous != digest:
+                self._urls_by_digest[previous].discard(url)
+            self._urls[url] = digest
+            self._urls_by_digest.setdefault(digest, set()).add(url)
+            self._execute("INSERT OR REPLACE INTO urls (url, digest) VALUES (?, ?)", (url, digest))
+            
+            while self.total_bytes > self.max_bytes and len(self._objects) > 1:
+                evicted = next(iter(self._objects))
+                self._drop(evicted)
+                self.evictions += 1
+    
+    def _drop(self, digest: str) -> None:
+        """Remove an image and the URLs pointing to it. The caller holds the lock."""
+        size = self._objects.pop(digest, None)
+        if size is None:
+            return
+        
+        self.total_bytes -= size
+        for url in self._urls_by_digest.pop(digest, set()):
+            if self._urls.get(url) == digest:
+                del self._urls[url]
+        
+        self._execute("DELETE FROM objects WHERE digest = ?", (digest,))
+        self._execute("DELETE FROM urls WHERE digest = ?", (digest,))
+        
+        try:
+            os.unlink(self._path(digest))
+        except OSError:
+            pass
+    
+    def _execute(self, sql: str, params: Tuple) -> None:
+        """Run a write statement against the index. The caller holds the lock."""
+        if self._conn is None:
+            return
+        
+        try:
+            self._conn.execute(sql, params)
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error writing artwork cache index: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+        
+        Returns:
+            Dictionary with image and URL counts, total bytes, hits, misses and evictions
+        """
+        return {
+            "images": len(self._objects),
+            "urls": len(self._urls),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+    
+    def close(self) -> None:
+        """Close the index database."""
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
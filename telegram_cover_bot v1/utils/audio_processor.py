@@ -3,17 +3,23 @@ Audio file processing module for the Telegram Cover Bot.
 This module provides functionality for extracting cover art from audio files
 and improving cover quality.
 """
+import asyncio
 import os
 import io
 import logging
-from typing import Dict, Any, Optional, Tuple
+import tempfile
+from typing import AsyncIterator, BinaryIO, Dict, Any, Optional, Tuple, Union
 from PIL import Image
 import mutagen
-from mutagen.id3 import ID3, APIC
+from mutagen.id3 import ID3, APIC, ID3NoHeaderError
 from mutagen.mp4 import MP4
 from mutagen.flac import FLAC
 from mutagen.oggvorbis import OggVorbis
 
+from config import AUDIO_MEMORY_MAX_BYTES
+from utils.quality_scoring import QualityScorer
+from utils.tag_stream import COMPLETE, NEED_FULL, EXTENSIONS, locate_tags
+
 # Configure logging
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
@@ -31,40 +37,50 @@ class AudioProcessor:
             temp_dir: Directory for temporary files
         """
         self.temp_dir = temp_dir
+        self.scorer = QualityScorer()
+        self.streams = 0
+        self.stopped_early = 0
+        self.bytes_read = 0
+        self.bytes_skipped = 0
         os.makedirs(temp_dir, exist_ok=True)
     
-    async def process_audio_file(self, file_path: str) -> Dict[str, Any]:
+    async def process_audio_file(self, audio_file: Union[str, BinaryIO],
+                                 file_name: Optional[str] = None) -> Dict[str, Any]:
         """
         Process an audio file to extract metadata and cover art.
         
         Args:
-            file_path: Path to the audio file
+            audio_file: Path to the audio file or a file object holding its bytes
+            file_name: File name telling the audio format (optional, the path is used if omitted)
             
         Returns:
-            Dictionary with metadata and cover art information
+            Dictionary with metadata and cover art information, the cover as
+            encoded image bytes
         """
         result = {
             "success": False,
             "metadata": {},
-            "cover_path": None,
+            "cover_data": None,
             "cover_quality": "none",
             "error": None
         }
         
         try:
-            # Extract metadata and cover art
-            metadata, cover_data = self._extract_metadata_and_cover(file_path)
+            # Extract metadata and cover art in a worker thread, tag parsing reads the whole file
+            metadata, cover_data = await asyncio.to_thread(
+                self._extract_metadata_and_cover, audio_file, file_name or audio_file
+            )
             
             if metadata:
                 result["metadata"] = metadata
                 result["success"] = True
             
             if cover_data:
-                # Save cover art to temporary file
-                cover_path, cover_quality = self._save_cover_art(cover_data, file_path)
+                # Assess the cover in a worker thread, scoring decodes the image
+                cover_quality = await asyncio.to_thread(self._assess_cover_art, cover_data)
                 
-                if cover_path:
-                    result["cover_path"] = cover_path
+                if cover_quality:
+                    result["cover_data"] = cover_data
                     result["cover_quality"] = cover_quality
             
         except Exception as e:
@@ -73,12 +89,106 @@ class AudioProcessor:
         
         return result
     
-    def _extract_metadata_and_cover(self, file_path: str) -> Tuple[Dict[str, Any], Optional[bytes]]:
+    async def process_audio_stream(self, chunks: AsyncIterator[bytes], file_name: str,
+                                   file_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Process an audio file while it downloads, stopping once its tags have arrived.
+        
+        The download is consumed chunk by chunk until the tags and pictures at
+        the start of the file are complete. Files whose tags are not at the
+        start, such as MP4 with the moov atom after the media data or ID3v1
+        only MP3, are downloaded in full, spilling to the temp directory past
+        AUDIO_MEMORY_MAX_BYTES.
+        
+        Args:
+            chunks: Downloaded bytes in order, an async generator is closed when reading stops
+            file_name: File name telling the audio format
+            file_size: Size of the whole file in bytes (optional, for reporting)
+            
+        Returns:
+            Dictionary as returned by process_audio_file, with bytes_read
+            (bytes downloaded) and stopped_early (whether the download was cut
+            off after the tags)
+        """
+        head = bytearray()
+        spool = None
+        bytes_read = 0
+        stopped_early = False
+        self.streams += 1
+        
+        try:
+            async for chunk in chunks:
+                bytes_read += len(chunk)
+                
+                # Once the whole file is needed the rest is only stored
+                if spool is not None:
+                    spool.write(chunk)
+                    continue
+                
+                head += chunk
+                state, size, container = locate_tags(head)
+                
+                if state == COMPLETE and len(head) >= size:
+                    stopped_early = True
+                    break
+                
+                if state == NEED_FULL:
+                    spool = tempfile.SpooledTemporaryFile(max_size=AUDIO_MEMORY_MAX_BYTES, dir=self.temp_dir)
+                    spool.write(head)
+                    head = None
+        except Exception as e:
+            logger.error(f"Error downloading audio file: {e}")
+            if spool is not None:
+                spool.close()
+            return {
+                "success": False,
+                "metadata": {},
+                "cover_data": None,
+                "cover_quality": "none",
+                "error": str(e),
+                "bytes_read": bytes_read,
+                "stopped_early": False
+            }
+        finally:
+            if hasattr(chunks, "aclose"):
+                await chunks.aclose()
+        
+        self.bytes_read += bytes_read
+        if stopped_early:
+            self.stopped_early += 1
+            if file_size:
+                self.bytes_skipped += max(0, file_size - bytes_read)
+        
+        logger.info(
+            f"Read {bytes_read} of {file_size or 'unknown'} bytes of {file_name}"
+            + (f", stopped after the {container} tags" if stopped_early else "")
+        )
+        
+        # Parse only the prefix holding the tags, or the whole file
+        if stopped_early:
+            audio_file, file_name = io.BytesIO(head[:size]), f"tags{EXTENSIONS[container]}"
+        elif spool is not None:
+            audio_file = spool
+        else:
+            audio_file = io.BytesIO(head)
+        
+        try:
+            result = await self.process_audio_file(audio_file, file_name)
+        finally:
+            audio_file.close()
+        
+        result["bytes_read"] = bytes_read
+        result["stopped_early"] = stopped_early
+        return result
+    
+    def _extract_metadata_and_cover(self, audio_file: Union[str, BinaryIO],
+                                    file_name: str) -> Tuple[Dict[str, Any], Optional[bytes]]:
         """
         Extract metadata and cover art from an audio file.
         
         Args:
-            file_path: Path to the audio file
+            audio_file: Path to the audio file or a file object holding its bytes
+            file_name: File name telling the audio format
             
         Returns:
             Tuple of (metadata dictionary, cover art bytes)
@@ -87,40 +197,44 @@ class AudioProcessor:
         cover_data = None
         
         # Determine file type
-        file_ext = os.path.splitext(file_path)[1].lower()
+        file_ext = os.path.splitext(file_name)[1].lower()
+        
+        # Parsers read file objects from the current position
+        if not isinstance(audio_file, str):
+            audio_file.seek(0)
         
         try:
             # MP3 files
             if file_ext in ['.mp3']:
-                audio = mutagen.File(file_path)
+                # Only the ID3 tag is read, so a download stopped right after the tag parses too
+                try:
+                    tags = ID3(audio_file)
+                except ID3NoHeaderError:
+                    tags = None
                 
                 # Extract metadata
-                if audio:
-                    if hasattr(audio, 'tags') and audio.tags:
-                        # ID3 tags
-                        tags = audio.tags
-                        
-                        # Title
-                        if 'TIT2' in tags:
-                            metadata['title'] = str(tags['TIT2'])
-                        
-                        # Artist
-                        if 'TPE1' in tags:
-                            metadata['artist'] = str(tags['TPE1'])
-                        
-                        # Album
-                        if 'TALB' in tags:
-                            metadata['album'] = str(tags['TALB'])
-                        
-                        # Extract cover art
-                        for tag in tags.values():
-                            if isinstance(tag, APIC):
-                                cover_data = tag.data
-                                break
+                if tags:
+                    # Title
+                    if 'TIT2' in tags:
+                        metadata['title'] = str(tags['TIT2'])
+                    
+                    # Artist
+                    if 'TPE1' in tags:
+                        metadata['artist'] = str(tags['TPE1'])
+                    
+                    # Album
+                    if 'TALB' in tags:
+                        metadata['album'] = str(tags['TALB'])
+                    
+                    # Extract cover art
+                    for tag in tags.values():
+                        if isinstance(tag, APIC):
+                            cover_data = tag.data
+                            break
             
             # MP4/M4A files
             elif file_ext in ['.m4a', '.mp4', '.aac']:
-                audio = MP4(file_path)
+                audio = MP4(audio_file)
                 
                 # Extract metadata
                 if '\xa9nam' in audio:
@@ -138,7 +252,7 @@ class AudioProcessor:
             
             # FLAC files
             elif file_ext in ['.flac']:
-                audio = FLAC(file_path)
+                audio = FLAC(audio_file)
                 
                 # Extract metadata
                 if 'title' in audio:
@@ -156,7 +270,7 @@ class AudioProcessor:
             
             # OGG files
             elif file_ext in ['.ogg']:
-                audio = OggVorbis(file_path)
+                audio = OggVorbis(audio_file)
                 
                 # Extract metadata
                 if 'title' in audio:
@@ -175,7 +289,7 @@ class AudioProcessor:
             else:
                 # Try generic approach
                 try:
-                    audio = mutagen.File(file_path)
+                    audio = mutagen.File(audio_file)
                     
                     if audio:
                         # Extract whatever metadata we can
@@ -190,22 +304,17 @@ class AudioProcessor:
         
         return metadata, cover_data
     
-    def _save_cover_art(self, cover_data: bytes, original_file_path: str) -> Tuple[Optional[str], str]:
+    def _assess_cover_art(self, cover_data: bytes) -> Optional[str]:
         """
-        Save cover art to a temporary file and assess its quality.
+        Assess the quality of cover art.
         
         Args:
             cover_data: Cover art binary data
-            original_file_path: Path to the original audio file
             
         Returns:
-            Tuple of (cover path, quality assessment)
+            Quality assessment ("low", "medium" or "high") or None if the image cannot be read
         """
         try:
-            # Generate a filename based on the original file
-            base_name = os.path.splitext(os.path.basename(original_file_path))[0]
-            cover_path = os.path.join(self.temp_dir, f"{base_name}_cover.jpg")
-            
             # Open image to check quality
             img = Image.open(io.BytesIO(cover_data))
             width, height = img.size
@@ -217,15 +326,32 @@ class AudioProcessor:
             if width >= 1000 and height >= 1000:
                 quality = "high"
             
-            # Save the image
-            with open(cover_path, 'wb') as f:
-                f.write(cover_data)
+            # A large cover that was upscaled or heavily compressed is not really high quality
+            if quality == "high":
+                scores = self.scorer.score_images([cover_data])[0]
+                if scores and scores["degraded"]:
+                    quality = "medium"
             
-            return cover_path, quality
+            return quality
             
         except Exception as e:
-            logger.error(f"Error saving cover art: {e}")
-            return None, "none"
+            logger.error(f"Error reading cover art: {e}")
+            return None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get streaming statistics.
+        
+        Returns:
+            Dictionary with streamed files, files whose download stopped after
+            the tags, bytes downloaded and bytes of those files left undownloaded
+        """
+        return {
+            "streams": self.streams,
+            "stopped_early": self.stopped_early,
+            "bytes_read": self.bytes_read,
+            "bytes_skipped": self.bytes_skipped
+        }
     
     def cleanup(self) -> None:
         """Clean up temporary files."""
@@ -0,0 +1,286 @@
+"""
+Perceptual cover index for the Telegram Cover Bot.
+This module hashes covers by what they look like rather than their bytes, so
+the same artwork at another size, from another storefront or embedded in an
+audio file is recognised, and its best known version can be reused.
+"""
+import logging
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from io import BytesIO
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from PIL import Image
+
+from config import COVER_INDEX_MAX_ENTRIES, COVER_HASH_MAX_DISTANCE
+from utils.sqlite_writer import WriteBehind
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# Side of the difference hash grid, giving a 64-bit hash
+HASH_SIZE = 8
+
+# Number of 16-bit chunks each hash is split into for the multi-index tables
+HASH_CHUNKS = 4
+CHUNK_BITS = 64 // HASH_CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+# Indexed entry: (hash, source, rendition, width, height, url)
+CoverEntry = Tuple[int, str, str, Optional[int], Optional[int], Optional[str]]
+
+
+def dhash(image: Union[bytes, Image.Image]) -> int:
+    """
+    Compute the 64-bit difference hash of an image.
+    
+    The image is reduced to a 9x8 grayscale grid and each bit records whether
+    a cell is brighter than its right neighbour, which survives resizing,
+    recompression and small color changes.
+    
+    Args:
+        image: Encoded image bytes or an image that has not been loaded yet
+    
+    Returns:
+        Hash as an unsigned 64-bit integer
+    """
+    if isinstance(image, bytes):
+        image = Image.open(BytesIO(image))
+    
+    # JPEGs are decoded at reduced scale, the grid needs only a few pixels per cell
+    image.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))
+    pixels = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.BOX).tobytes()
+    
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for column in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + column] > pixels[offset + column + 1])
+    return value
+
+
+def _chunks(value: int) -> List[int]:
+    """Split a hash into its multi-index chunks."""
+    return [(value >> (CHUNK_BITS * index)) & CHUNK_MASK for index in range(HASH_CHUNKS)]
+
+
+def _to_signed(value: int) -> int:
+    """Map an unsigned 64-bit hash to the signed range SQLite stores."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class CoverIndex:
+    """
+    Persistent LRU index of cover hashes with near-duplicate search.
+    
+    Hashes are found by multi-index hashing: each 64-bit hash is split into
+    four 16-bit chunks with one table per chunk. Two hashes within distance d
+    must agree to within d // 4 bits on at least one chunk, so a search only
+    probes the few chunk values that close to the query and compares the
+    handful of hashes found there, instead of walking the whole index.
+    
+    Writes are queued and committed in batches off the event loop.
+    """
+    
+    def __init__(self, db_path: Optional[str] = None,
+                 max_entries: int = COVER_INDEX_MAX_ENTRIES,
+                 max_distance: int = COVER_HASH_MAX_DISTANCE):
+        """
+        Initialize the cover index.
+        
+        Args:
+            db_path: Path to the SQLite database file (optional, memory only if omitted)
+            max_entries: Maximum number of indexed covers
+            max_distance: Largest Hamming distance at which two covers count as the same artwork
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self._entries: "OrderedDict[str, CoverEntry]" = OrderedDict()
+        self._keys_by_hash: Dict[int, Set[str]] = {}
+        self._tables: List[Dict[int, Set[int]]] = [{} for _ in range(HASH_CHUNKS)]
+        self._writer: Optional[WriteBehind] = None
+        self.lookups = 0
+        self.matches = 0
+        
+        # Bit flips to probe per chunk, every pattern of up to max_distance // HASH_CHUNKS bits
+        chunk_radius = max_distance // HASH_CHUNKS
+        self._flips = [0]
+        for bits in range(1, chunk_radius + 1):
+            for positions in combinations(range(CHUNK_BITS), bits):
+                self._flips.append(sum(1 << position for position in positions))
+        
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            conn = sqlite3.connect(db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cover_hashes (
+                    key TEXT PRIMARY KEY,
+                    hash INTEGER NOT NULL,
+                    source TEXT NOT NULL,
+                    rendition TEXT NOT NULL,
+                    width INTEGER,
+                    height INTEGER,
+                    url TEXT,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            conn.commit()
+            
+            # Load the most recently used entries, oldest first so LRU order is preserved
+            rows = conn.execute(
+                """
+                SELECT hash, source, rendition, width, height, url FROM (
+                    SELECT * FROM cover_hashes ORDER BY last_used DESC LIMIT ?
+                ) ORDER BY last_used ASC
+                """,
+                (max_entries,)
+            ).fetchall()
+            for value, source, rendition, width, height, url in rows:
+                self._insert((value & ((1 << 64) - 1), source, rendition, width, height, url))
+            
+            self._writer = WriteBehind(conn, "cover index")
+    
+    @staticmethod
+    def _make_key(source: str, rendition: str) -> str:
+        """Build the storage key for a source and rendition."""
+        return f"{rendition}|{source}"
+    
+    def _insert(self, entry: CoverEntry) -> None:
+        """Add an entry to the in-memory tables, replacing any entry with the same key."""
+        key = self._make_key(entry[1], entry[2])
+        self._remove(key)
+        
+        self._entries[key] = entry
+        value = entry[0]
+        keys = self._keys_by_hash.setdefault(value, set())
+        if not keys:
+            for table, chunk in zip(self._tables, _chunks(value)):
+                table.setdefault(chunk, set()).add(value)
+        keys.add(key)
+    
+    def _remove(self, key: str) -> None:
+        """Remove an entry from the in-memory tables."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        
+        value = entry[0]
+        keys = self._keys_by_hash[value]
+        keys.discard(key)
+        if keys:
+            return
+        
+        del self._keys_by_hash[value]
+        for table, chunk in zip(self._tables, _chunks(value)):
+            bucket = table[chunk]
+            bucket.discard(value)
+            if not bucket:
+                del table[chunk]
+    
+    def add(self, value: int, source: str, rendition: str,
+            width: Optional[int] = None, height: Optional[int] = None,
+            url: Optional[str] = None) -> None:
+        """
+        Index a cover.
+        
+        Args:
+            value: Difference hash of the cover
+            source: Artwork identifier (collection ID, URL or content hash)
+            rendition: How the cover was sent (e.g. "photo"), as used by the file ID cache
+            width: Image width in pixels (optional)
+            height: Image height in pixels (optional)
+            url: Artwork URL (optional)
+        """
+        self._insert((value, source, rendition, width, height, url))
+        
+        self._execute(
+            """
+            INSERT OR REPLACE INTO cover_hashes (key, hash, source, rendition, width, height, url, last_used)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (self._make_key(source, rendition), _to_signed(value), source, rendition, width, height, url, time.time())
+        )
+        
+        while len(self._entries) > self.max_entries:
+            evicted = next(iter(self._entries))
+            self._remove(evicted)
+            self._execute("DELETE FROM cover_hashes WHERE key = ?", (evicted,))
+    
+    def find(self, value: int, max_distance: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Find indexed covers that look like the given one.
+        
+        Args:
+            value: Difference hash of the cover
+            max_distance: Largest Hamming distance to accept (optional, at most the index default)
+        
+        Returns:
+            Matches as dictionaries with distance, source, rendition, width,
+            height and url, closest first and larger images first among equals
+        """
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        self.lookups += 1
+        
+        candidates: Set[int] = set()
+        for table, chunk in zip(self._tables, _chunks(value)):
+            for flip in self._flips:
+                bucket = table.get(chunk ^ flip)
+                if bucket:
+                    candidates.update(bucket)
+        
+        matches = []
+        for candidate in candidates:
+            distance = (candidate ^ value).bit_count()
+            if distance > max_distance:
+                continue
+            for key in self._keys_by_hash[candidate]:
+                _, source, rendition, width, height, url = self._entries[key]
+                matches.append({
+                    "distance": distance,
+                    "source": source,
+                    "rendition": rendition,
+                    "width": width,
+                    "height": height,
+                    "url": url
+                })
+        
+        if matches:
+            self.matches += 1
+        
+        matches.sort(key=lambda match: (match["distance"], -(match["width"] or 0) * (match["height"] or 0)))
+        return matches
+    
+    def _execute(self, sql: str, params: Tuple) -> None:
+        """Queue a write statement for the database, if there is one."""
+        if self._writer is not None:
+            self._writer.execute(sql, params)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get index statistics.
+        
+        Returns:
+            Dictionary with entry count, distinct hashes, lookups and lookups with a match
+        """
+        return {
+            "entries": len(self._entries),
+            "hashes": len(self._keys_by_hash),
+            "lookups": self.lookups,
+            "matches": self.matches
+        }
+    
+    def close(self) -> None:
+        """Write pending changes and close the database connection."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
@@ -276,7 +276,13 @@ class InteractionDatabase:
         
         # Add selected result if available
         if selected_index is not None and 0 <= selected_index < len(results):
-            data["selected_result"] = results[selected_index]
+            selected_result = results[selected_index]
+            
+            # Result records are stored in their dictionary format
+            if hasattr(selected_result, "to_dict"):
+                selected_result = selected_result.to_dict()
+                
+            data["selected_result"] = selected_result
         
         self.log_interaction("result", data, user_id, group_id)
     
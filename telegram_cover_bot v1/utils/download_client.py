@@ -0,0 +1,162 @@
+"""
+Shared download client for the Telegram Cover Bot.
+This module owns the pooled, keep-alive HTTP connections used for every
+artwork download, so covers reuse open TCP and TLS connections to the
+artwork CDN instead of opening new ones per request.
+"""
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, Optional
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    HTTP_POOL_SIZE, HTTP_KEEPALIVE_TIMEOUT, DOWNLOAD_POOL_PER_HOST,
+    DOWNLOAD_CONNECT_TIMEOUT, DOWNLOAD_DNS_CACHE_TTL, ARTWORK_FETCH_TIMEOUT
+)
+
+
+class DownloadClient:
+    """
+    Pooled HTTP client shared by all artwork downloads.
+    
+    Asynchronous callers use one aiohttp session whose connector keeps idle
+    connections alive, limits connections per host and caches DNS lookups.
+    Code running in worker threads uses one requests session with a
+    connection pool of the same size. Both count new and reused connections
+    so the reuse rate can be reported.
+    """
+    
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE,
+                 pool_per_host: int = DOWNLOAD_POOL_PER_HOST,
+                 timeout: float = ARTWORK_FETCH_TIMEOUT,
+                 connect_timeout: float = DOWNLOAD_CONNECT_TIMEOUT,
+                 dns_cache_ttl: int = DOWNLOAD_DNS_CACHE_TTL):
+        """
+        Initialize the download client.
+        
+        Args:
+            pool_size: Maximum number of open connections
+            pool_per_host: Maximum number of open connections to one host
+            timeout: Default total timeout in seconds for a request
+            connect_timeout: Timeout in seconds for opening a connection
+            dns_cache_ttl: Seconds a resolved host name is cached
+        """
+        self.pool_size = pool_size
+        self.pool_per_host = pool_per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.dns_cache_ttl = dns_cache_ttl
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.connections_created = 0
+        self.connections_reused = 0
+        
+        # Shared requests session for downloads made from worker threads
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_per_host)
+        self.sync_session = requests.Session()
+        self.sync_session.mount("https://", adapter)
+        self.sync_session.mount("http://", adapter)
+    
+    def get_session(self) -> aiohttp.ClientSession:
+        """
+        Get the shared aiohttp session, creating it on first use.
+        
+        The session has to be created inside the running event loop, so it is
+        built lazily rather than in the constructor.
+        
+        Returns:
+            The pooled aiohttp client session
+        """
+        if self.session is None or self.session.closed:
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_connection_create_end.append(self._on_connection_created)
+            trace_config.on_connection_reuseconn.append(self._on_connection_reused)
+            
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_per_host,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_cache_ttl
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector, timeout=self.timeout, trace_configs=[trace_config]
+            )
+        return self.session
+    
+    async def iter_chunks(self, url: str, chunk_size: int,
+                          timeout: Optional[float] = None) -> AsyncIterator[bytes]:
+        """
+        Download a URL chunk by chunk on the pooled session.
+        
+        Closing the generator before the end stops the download.
+        
+        Args:
+            url: URL to download
+            chunk_size: Maximum number of bytes per chunk
+            timeout: Total timeout in seconds (optional, the client default if omitted)
+        
+        Yields:
+            Downloaded bytes in order
+        
+        Raises:
+            RuntimeError: If the server does not answer with the file; the URL is
+                left out of the message because it may contain a token
+        """
+        request_timeout = aiohttp.ClientTimeout(total=timeout, connect=self.timeout.connect) if timeout else None
+        async with self.get_session().get(url, timeout=request_timeout) as response:
+            if response.status != 200:
+                raise RuntimeError(f"Download failed with HTTP status {response.status}")
+            async for chunk in response.content.iter_chunked(chunk_size):
+                yield chunk
+    
+    async def _on_connection_created(self, session: aiohttp.ClientSession,
+                                     context: SimpleNamespace, params: Any) -> None:
+        """Count a newly opened connection."""
+        self.connections_created += 1
+    
+    async def _on_connection_reused(self, session: aiohttp.ClientSession,
+                                    context: SimpleNamespace, params: Any) -> None:
+        """Count a request served on an already open connection."""
+        self.connections_reused += 1
+    
+    def _sync_counts(self) -> Dict[str, int]:
+        """Sum connections opened and requests sent by the requests session's pools."""
+        connections = requests_sent = 0
+        
+        # Both schemes are mounted on the same adapter
+        adapters = {id(adapter): adapter for adapter in self.sync_session.adapters.values()}
+        for adapter in adapters.values():
+            for key in adapter.poolmanager.pools.keys():
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+                    requests_sent += pool.num_requests
+        
+        return {"connections": connections, "requests": requests_sent}
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get connection statistics.
+        
+        Returns:
+            Dictionary with connections opened and reused by both sessions
+            and the share of requests served on a reused connection
+        """
+        sync_counts = self._sync_counts()
+        created = self.connections_created + sync_counts["connections"]
+        reused = self.connections_reused + max(0, sync_counts["requests"] - sync_counts["connections"])
+        
+        return {
+            "connections_created": created,
+            "connections_reused": reused,
+            "reuse_rate": round(reused / (created + reused), 3) if created + reused else 0.0
+        }
+    
+    async def close(self) -> None:
+        """Close both sessions and their pooled connections."""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+        
+        self.sync_session.close()
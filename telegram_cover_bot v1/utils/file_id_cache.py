@@ -0,0 +1,214 @@
+"""
+Telegram file ID cache for the Telegram Cover Bot.
+This module remembers the file_id Telegram assigns to each uploaded cover, so
+a cover that was sent once can be sent again without uploading any bytes.
+"""
+import logging
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from telegram import Message
+
+from config import FILE_ID_CACHE_MAX_ENTRIES
+from utils.sqlite_writer import WriteBehind
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# Cached entry: (file_id, width, height, source URL)
+FileIdEntry = Tuple[str, Optional[int], Optional[int], Optional[str]]
+
+
+class FileIdCache:
+    """
+    Persistent LRU map of (source, rendition) pairs to Telegram file IDs.
+    
+    The source identifies the artwork (a collection ID, a URL or a content
+    hash) and the rendition identifies how it was sent, so a cover re-encoded
+    by the bot and a cover fetched by Telegram from a URL are kept apart.
+    
+    Lookups only touch memory. Writes are queued and committed in batches off
+    the event loop, and usage times are written with the next batch.
+    """
+    
+    def __init__(self, db_path: Optional[str] = None, max_entries: int = FILE_ID_CACHE_MAX_ENTRIES):
+        """
+        Initialize the file ID cache.
+        
+        Args:
+            db_path: Path to the SQLite database file (optional, memory only if omitted)
+            max_entries: Maximum number of remembered file IDs
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, FileIdEntry]" = OrderedDict()
+        self._writer: Optional[WriteBehind] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            conn = sqlite3.connect(db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS file_ids (
+                    key TEXT PRIMARY KEY,
+                    file_id TEXT NOT NULL,
+                    width INTEGER,
+                    height INTEGER,
+                    url TEXT,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            conn.commit()
+            
+            # Load the most recently used entries, oldest first so LRU order is preserved
+            rows = conn.execute(
+                """
+                SELECT key, file_id, width, height, url FROM (
+                    SELECT * FROM file_ids ORDER BY last_used DESC LIMIT ?
+                ) ORDER BY last_used ASC
+                """,
+                (max_entries,)
+            ).fetchall()
+            for key, file_id, width, height, url in rows:
+                self._entries[key] = (file_id, width, height, url)
+            
+            self._writer = WriteBehind(conn, "file ID cache")
+    
+    @staticmethod
+    def _make_key(source: str, rendition: str) -> str:
+        """Build the storage key for a source and rendition."""
+        return f"{rendition}|{source}"
+    
+    def get(self, source: str, rendition: str) -> Optional[FileIdEntry]:
+        """
+        Get the cached file ID for a cover.
+        
+        Args:
+            source: Artwork identifier (collection ID, URL or content hash)
+            rendition: How the cover was sent (e.g. "photo")
+        
+        Returns:
+            Tuple of (file_id, width, height, url) or None if the cover was never sent
+        """
+        key = self._make_key(source, rendition)
+        entry = self._entries.get(key)
+        
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        self._entries.move_to_end(key)
+        if self._writer is not None:
+            self._writer.defer("UPDATE file_ids SET last_used = ? WHERE key = ?", (time.time(), key))
+        return entry
+    
+    def has(self, source: str, rendition: str) -> bool:
+        """
+        Check whether a cover was sent before, without counting a lookup.
+        
+        Args:
+            source: Artwork identifier (collection ID, URL or content hash)
+            rendition: How the cover was sent (e.g. "photo")
+        
+        Returns:
+            True if a file ID is cached for the cover
+        """
+        return self._make_key(source, rendition) in self._entries
+    
+    def set(self, source: str, rendition: str, file_id: str,
+            width: Optional[int] = None, height: Optional[int] = None,
+            url: Optional[str] = None) -> None:
+        """
+        Remember the file ID of a sent cover.
+        
+        Args:
+            source: Artwork identifier (collection ID, URL or content hash)
+            rendition: How the cover was sent (e.g. "photo")
+            file_id: File ID assigned by Telegram
+            width: Image width shown in captions (optional)
+            height: Image height shown in captions (optional)
+            url: Artwork URL used for sharing (optional)
+        """
+        key = self._make_key(source, rendition)
+        self._entries[key] = (file_id, width, height, url)
+        self._entries.move_to_end(key)
+        
+        self._execute(
+            "INSERT OR REPLACE INTO file_ids (key, file_id, width, height, url, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, file_id, width, height, url, time.time())
+        )
+        
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._execute("DELETE FROM file_ids WHERE key = ?", (evicted,))
+    
+    def set_from_message(self, source: str, rendition: str, message: Message,
+                         width: Optional[int] = None, height: Optional[int] = None,
+                         url: Optional[str] = None) -> None:
+        """
+        Remember the file ID of the largest photo size in a sent message.
+        
+        Args:
+            source: Artwork identifier (collection ID, URL or content hash)
+            rendition: How the cover was sent (e.g. "photo")
+            message: Message returned by send_photo
+            width: Image width shown in captions (optional)
+            height: Image height shown in captions (optional)
+            url: Artwork URL used for sharing (optional)
+        """
+        if message is None or not message.photo:
+            return
+        
+        self.set(source, rendition, message.photo[-1].file_id, width, height, url)
+    
+    def invalidate(self, source: str, rendition: str) -> None:
+        """
+        Forget a file ID, e.g. after Telegram rejected it.
+        
+        Args:
+            source: Artwork identifier (collection ID, URL or content hash)
+            rendition: How the cover was sent (e.g. "photo")
+        """
+        key = self._make_key(source, rendition)
+        
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+        
+        self._execute("DELETE FROM file_ids WHERE key = ?", (key,))
+    
+    def _execute(self, sql: str, params: Tuple) -> None:
+        """Queue a write statement for the database, if there is one."""
+        if self._writer is not None:
+            self._writer.execute(sql, params)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+        
+        Returns:
+            Dictionary with entry count, hits, misses and invalidations
+        """
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations
+        }
+    
+    def close(self) -> None:
+        """Write pending changes and close the database connection."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
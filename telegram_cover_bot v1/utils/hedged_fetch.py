@@ -0,0 +1,217 @@
+"""
+Hedged artwork downloads for the Telegram Cover Bot.
+This module fetches a cover from a ladder of artwork URLs, starting the next
+rung when the current one is slow, so a missing high resolution asset does
+not double the wait.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+
+from config import ARTWORK_HEDGE_DELAY, ARTWORK_FETCH_TIMEOUT, LATENCY_SAMPLES
+from utils.download_client import DownloadClient
+from utils.image_processor import ImageStreamReader
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# Fetch result: (image_bytes, image_info, error_message, url)
+FetchResult = Tuple[Optional[bytes], Optional[Dict[str, Any]], Optional[str], Optional[str]]
+
+
+class LatencyTracker:
+    """Rolling window of latencies with percentile reporting."""
+    
+    def __init__(self, max_samples: int = LATENCY_SAMPLES):
+        """
+        Initialize the tracker.
+        
+        Args:
+            max_samples: Number of most recent samples kept
+        """
+        self._samples = deque(maxlen=max_samples)
+    
+    def record(self, seconds: float) -> None:
+        """
+        Record one latency sample.
+        
+        Args:
+            seconds: Latency in seconds
+        """
+        self._samples.append(seconds)
+    
+    def percentiles(self) -> Dict[str, float]:
+        """
+        Get latency percentiles of the recorded samples.
+        
+        Returns:
+            Dictionary with p50, p90, p99 and max in milliseconds (empty if no samples)
+        """
+        if not self._samples:
+            return {}
+        
+        samples = sorted(self._samples)
+        
+        def pick(fraction: float) -> float:
+            return round(samples[min(len(samples) - 1, int(fraction * len(samples)))] * 1000, 1)
+        
+        return {"p50": pick(0.50), "p90": pick(0.90), "p99": pick(0.99), "max": round(samples[-1] * 1000, 1)}
+
+
+class HedgedFetcher:
+    """
+    Download a cover from the first rung of a URL ladder that delivers a valid image.
+    
+    The best URL is requested first. If it has not produced an acceptable
+    image header within the hedge delay, or it fails, the next rung is started
+    alongside it. The first complete valid image wins and the other downloads
+    are cancelled.
+    """
+    
+    def __init__(self, hedge_delay: float = ARTWORK_HEDGE_DELAY,
+                 timeout: float = ARTWORK_FETCH_TIMEOUT,
+                 client: Optional[DownloadClient] = None):
+        """
+        Initialize the fetcher.
+        
+        Args:
+            hedge_delay: Seconds to wait for a valid header before starting the next rung
+            timeout: Total timeout in seconds for a single download
+            client: Shared download client (optional, a new client is created if omitted)
+        """
+        self.hedge_delay = hedge_delay
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.client = client or DownloadClient()
+        self._owns_client = client is None
+        self.latency = LatencyTracker()
+        self.fetches = 0
+        self.hedged = 0
+        self.fallbacks = 0
+    
+    async def close(self) -> None:
+        """Close the download client, unless it is shared."""
+        if self._owns_client:
+            await self.client.close()
+    
+    async def fetch(self, urls: Sequence[str], min_dimension: int = 0) -> FetchResult:
+        """
+        Fetch the first valid image from a ladder of URLs.
+        
+        Args:
+            urls: Artwork URLs, best first
+            min_dimension: Minimum accepted width and height
+        
+        Returns:
+            Tuple of (image_bytes, image_info, error_message, url). image_bytes is
+            None if no rung delivered a valid image; the error is then the one
+            reported by the best rung.
+        """
+        if not urls:
+            return None, None, "No artwork URL", None
+        
+        start = time.monotonic()
+        self.fetches += 1
+        
+        remaining: List[str] = list(urls)
+        attempts: Dict[asyncio.Task, Tuple[int, str, asyncio.Event]] = {}
+        errors: Dict[int, Tuple[Optional[Dict[str, Any]], Optional[str]]] = {}
+        
+        def launch() -> None:
+            rung = len(urls) - len(remaining)
+            url = remaining.pop(0)
+            header_ready = asyncio.Event()
+            task = asyncio.create_task(self._download(url, min_dimension, header_ready))
+            attempts[task] = (rung, url, header_ready)
+        
+        launch()
+        
+        try:
+            while attempts:
+                # Keep waiting without hedging once some rung has an acceptable header
+                waiting_for_header = not any(event.is_set() for _, _, event in attempts.values())
+                timeout = self.hedge_delay if remaining and waiting_for_header else None
+                
+                done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                
+                if not done:
+                    self.hedged += 1
+                    launch()
+                    continue
+                
+                for task in done:
+                    rung, url, _ = attempts.pop(task)
+                    image_data, info, error = task.result()
+                    
+                    if image_data is not None:
+                        if rung > 0:
+                            self.fallbacks += 1
+                        return image_data, info, None, url
+                    
+                    errors[rung] = (info, error)
+                
+                # A failed rung is replaced immediately rather than after the delay
+                if remaining and not attempts:
+                    launch()
+        finally:
+            for task in attempts:
+                task.cancel()
+            if attempts:
+                await asyncio.gather(*attempts, return_exceptions=True)
+            self.latency.record(time.monotonic() - start)
+        
+        info, error = errors[min(errors)]
+        return None, info, error, None
+    
+    async def _download(self, url: str, min_dimension: int,
+                        header_ready: asyncio.Event) -> Tuple[Optional[bytes], Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Download one rung, signalling once its header has been accepted.
+        
+        Args:
+            url: Artwork URL
+            min_dimension: Minimum accepted width and height
+            header_ready: Event set when the header has been parsed and accepted
+        
+        Returns:
+            Tuple of (image_bytes, image_info, error_message)
+        """
+        try:
+            session = self.client.get_session()
+            
+            async with session.get(url, timeout=self.timeout) as response:
+                if response.status != 200:
+                    return None, None, f"Download failed: HTTP {response.status}"
+                
+                reader = ImageStreamReader(min_dimension, declared_size=response.content_length or 0)
+                if reader.error is None:
+                    async for chunk in response.content.iter_chunked(16384):
+                        if not reader.feed(chunk):
+                            break
+                        if reader.header_ready:
+                            header_ready.set()
+                
+                return reader.finish()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Error downloading artwork {url}: {e}")
+            return None, None, f"Download failed: {str(e)}"
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get fetcher statistics.
+        
+        Returns:
+            Dictionary with fetch, hedge and fallback counts and latency percentiles
+        """
+        return {
+            "fetches": self.fetches,
+            "hedged": self.hedged,
+            "fallbacks": self.fallbacks,
+            "latency_ms": self.latency.percentiles()
+        }
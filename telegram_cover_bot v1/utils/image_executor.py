@@ -0,0 +1,195 @@
+"""
+Image processing executor for the Telegram Cover Bot.
+This module runs Pillow decode, resize and encode work on a worker pool so
+large covers do not block the event loop.
+"""
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import IMAGE_WORKERS, IMAGE_USE_PROCESSES, IMAGE_MAX_QUEUE
+from utils.cover_index import dhash
+from utils.image_processor import ImageProcessor
+from utils.image_quality_validator import ImageQualityValidator
+
+
+def _validate_image(image_data: bytes) -> Tuple[bool, Optional[Dict[str, Any]], Optional[str]]:
+    """Validate an image and describe it, returning plain data that can leave a worker process."""
+    # BytesIO shares the bytes buffer until it is written to, so no copy is made here
+    is_valid, image, error = ImageProcessor.validate_image(BytesIO(image_data))
+    info = ImageProcessor.get_image_info(image) if is_valid else None
+    return is_valid, info, error
+
+
+def _prepare_for_telegram(image_data: bytes) -> bytes:
+    """Prepare an image for Telegram and return the encoded bytes."""
+    return ImageProcessor.prepare_for_telegram(BytesIO(image_data)).getvalue()
+
+
+def _process_for_telegram(image_data: bytes) -> Tuple[bool, Optional[bytes], Optional[Dict[str, Any]], Optional[str]]:
+    """Validate and prepare an image for Telegram with a single decode."""
+    return ImageProcessor.process_for_telegram(image_data)
+
+
+class ImageExecutor:
+    """
+    Bounded worker pool for image processing.
+    
+    Threads are used by default because Pillow releases the GIL while
+    decoding, resizing and encoding, and image bytes are then shared with the
+    worker without copying. At most ``max_workers + max_queue`` jobs are
+    submitted at once; further callers wait on the event loop instead of
+    growing the pool's internal queue.
+    """
+    
+    def __init__(self, max_workers: int = IMAGE_WORKERS,
+                 max_queue: int = IMAGE_MAX_QUEUE,
+                 use_processes: bool = IMAGE_USE_PROCESSES):
+        """
+        Initialize the image executor.
+        
+        Args:
+            max_workers: Number of worker threads or processes
+            max_queue: Number of jobs allowed to wait for a free worker
+            use_processes: Use worker processes instead of threads
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.use_processes = use_processes
+        self._executor: Executor = (
+            ProcessPoolExecutor(max_workers=max_workers) if use_processes
+            else ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image")
+        )
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.completed = 0
+        self.held_back = 0
+        self.paths: Dict[str, int] = {}
+    
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a function on the worker pool.
+        
+        Args:
+            func: Function to run (must be picklable when using processes)
+            *args: Positional arguments for the function
+        
+        Returns:
+            The function's return value
+        """
+        # Created on first use so it belongs to the running event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers + self.max_queue)
+        
+        if self._slots.locked():
+            self.held_back += 1
+        
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, func, *args)
+            self.completed += 1
+            return result
+    
+    async def validate_image(self, image_data: bytes) -> Tuple[bool, Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Validate an image on the worker pool.
+        
+        Args:
+            image_data: Encoded image bytes
+        
+        Returns:
+            Tuple of (is_valid, image_info, error_message)
+        """
+        return await self.run(_validate_image, image_data)
+    
+    async def prepare_for_telegram(self, image_data: bytes) -> bytes:
+        """
+        Resize and re-encode an image for Telegram on the worker pool.
+        
+        Args:
+            image_data: Encoded image bytes
+        
+        Returns:
+            Encoded image bytes ready to send
+        """
+        return await self.run(_prepare_for_telegram, image_data)
+    
+    async def process_for_telegram(self, image_data: bytes) -> Tuple[bool, Optional[bytes], Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Validate and prepare an image for Telegram on the worker pool, decoding it once.
+        
+        Args:
+            image_data: Encoded image bytes
+        
+        Returns:
+            Tuple of (is_valid, output_bytes, image_info, error_message)
+        """
+        result = await self.run(_process_for_telegram, image_data)
+        
+        # Count which path each cover took (pass-through, resize, re-encode or rejection)
+        path = result[2]["path"] if result[0] else "rejected"
+        self.paths[path] = self.paths.get(path, 0) + 1
+        
+        return result
+    
+    async def dhash(self, image_data: bytes) -> int:
+        """
+        Compute the perceptual difference hash of an image on the worker pool.
+        
+        Args:
+            image_data: Encoded image bytes
+        
+        Returns:
+            64-bit difference hash
+        """
+        return await self.run(dhash, image_data)
+    
+    async def enhance_image(self, input_path: str, output_path: str,
+                            validator: Optional[ImageQualityValidator] = None) -> Dict[str, Any]:
+        """
+        Enhance an image file on the worker pool.
+        
+        Args:
+            input_path: Path to the input image file
+            output_path: Path to save the enhanced image
+            validator: Image quality validator (optional, default thresholds if omitted)
+        
+        Returns:
+            Dictionary with enhancement results
+        """
+        validator = validator or ImageQualityValidator()
+        return await self.run(validator.enhance_image, input_path, output_path)
+    
+    async def enhance_image_data(self, image_data: bytes,
+                                 validator: Optional[ImageQualityValidator] = None) -> Tuple[Optional[bytes], Dict[str, Any]]:
+        """
+        Enhance an image held in memory on the worker pool.
+        
+        Args:
+            image_data: Encoded image bytes
+            validator: Image quality validator (optional, default thresholds if omitted)
+        
+        Returns:
+            Tuple of (enhanced JPEG bytes or None on failure, dictionary with enhancement results)
+        """
+        validator = validator or ImageQualityValidator()
+        return await self.run(validator.enhance_image_data, image_data)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get executor statistics.
+        
+        Returns:
+            Dictionary with completed and held back job counts and cover paths
+        """
+        return {
+            "workers": self.max_workers,
+            "processes": self.use_processes,
+            "completed": self.completed,
+            "held_back": self.held_back,
+            "paths": dict(self.paths)
+        }
+    
+    def shutdown(self) -> None:
+        """Stop the worker pool, dropping jobs that have not started."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
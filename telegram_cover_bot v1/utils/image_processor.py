@@ -4,30 +4,204 @@ Utility module for image processing in the Telegram Cover Bot.
 import requests
 from io import BytesIO
 from typing import Optional, Tuple
-from PIL import Image
+from PIL import Image, ImageFile
+
+from config import (
+    MAX_IMAGE_DIMENSION, MIN_IMAGE_DIMENSION, IMAGE_QUALITY, PASSTHROUGH_FORMATS,
+    TELEGRAM_PHOTO_MAX_BYTES, TELEGRAM_PHOTO_MAX_RATIO, MAX_DOWNLOAD_BYTES, IMAGE_HEADER_MAX_BYTES
+)
+
+# Bytes every complete file of a pass-through format ends with
+END_MARKERS = {
+    "JPEG": b"\xff\xd9",
+    "PNG": b"IEND\xaeB`\x82",
+}
+
+
+class ImageStreamReader:
+    """
+    Incremental reader for an image being downloaded.
+    
+    Chunks are collected as they arrive and the header is parsed as soon as it
+    is complete, so a download can be abandoned before the body is read when
+    the image is too small, a likely decompression bomb or over the byte cap.
+    """
+    
+    def __init__(self, min_dimension: int = 0, max_bytes: int = MAX_DOWNLOAD_BYTES,
+                 declared_size: int = 0):
+        """
+        Initialize the reader.
+        
+        Args:
+            min_dimension: Minimum accepted width and height (0 to accept any size)
+            max_bytes: Maximum number of bytes to accept
+            declared_size: Size announced by the server, 0 if unknown
+        """
+        self.min_dimension = min_dimension
+        self.max_bytes = max_bytes
+        self.declared_size = declared_size
+        self.info: Optional[dict] = None
+        self.error: Optional[str] = None
+        self._parser: Optional[ImageFile.Parser] = ImageFile.Parser()
+        self._data = bytearray()
+        
+        if declared_size > max_bytes:
+            self.error = "Image file too large"
+    
+    @property
+    def header_ready(self) -> bool:
+        """Whether the header has been parsed and accepted."""
+        return self.info is not None and self.error is None
+    
+    def feed(self, chunk: bytes) -> bool:
+        """
+        Add a downloaded chunk.
+        
+        Args:
+            chunk: The next bytes of the image
+            
+        Returns:
+            True if the download should continue, False if the image was rejected
+        """
+        if self.error:
+            return False
+        
+        self._data += chunk
+        if len(self._data) > self.max_bytes:
+            self.error = "Image file too large"
+            return False
+        
+        if self.info is not None:
+            return True
+        
+        try:
+            self._parser.feed(chunk)
+        except Exception as e:
+            self.error = f"Invalid image: {str(e)}"
+            return False
+        
+        if self._parser.image is None:
+            if len(self._data) > IMAGE_HEADER_MAX_BYTES:
+                self.error = "Invalid image: header not found"
+                return False
+            return True
+        
+        # Header parsed, decide before reading the rest of the body
+        self.info = ImageProcessor.get_image_info(self._parser.image)
+        self.info["file_size"] = self.declared_size
+        
+        width, height = self._parser.image.size
+        if width < self.min_dimension or height < self.min_dimension:
+            self.error = "Image resolution too low"
+        elif width * height > Image.MAX_IMAGE_PIXELS:
+            self.error = "Image dimensions too large"
+        
+        return self.error is None
+    
+    def finish(self) -> Tuple[Optional[bytes], Optional[dict], Optional[str]]:
+        """
+        Complete the download.
+        
+        Returns:
+            Tuple of (image_bytes, image_info, error_message)
+        """
+        self.close()
+        
+        if self.error:
+            return None, self.info, self.error
+        
+        if self.info is None:
+            return None, None, "Invalid image: header not found"
+        
+        self.info["file_size"] = len(self._data)
+        return bytes(self._data), self.info, None
+    
+    def close(self) -> None:
+        """Release the header parser and its decoder. Safe to call more than once."""
+        if self._parser is None:
+            return
+        
+        parser, self._parser = self._parser, None
+        try:
+            parser.close()
+        except Exception:
+            # Only the header was fed, so the parser reports an incomplete image
+            pass
 
 
 class ImageProcessor:
     """Utility class for processing and validating cover images."""
     
     @staticmethod
-    def download_image(url: str) -> Optional[BytesIO]:
+    def download_image(url: str, session: Optional[requests.Session] = None) -> Optional[BytesIO]:
         """
         Download an image from a URL.
         
         Args:
             url: The URL of the image to download
+            session: Pooled session to download with (optional, e.g. DownloadClient.sync_session)
             
         Returns:
             BytesIO object containing the image data or None if download failed
         """
-        try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            return BytesIO(response.content)
-        except (requests.RequestException, IOError) as e:
-            print(f"Error downloading image: {e}")
+        image_data, _, error = ImageProcessor.fetch_image(url, session=session)
+        
+        if image_data is None:
+            if error:
+                print(f"Error downloading image: {error}")
             return None
+            
+        return BytesIO(image_data)
+    
+    @staticmethod
+    def fetch_image(url: str, min_dimension: int = 0, max_bytes: int = MAX_DOWNLOAD_BYTES,
+                    header_only: bool = False,
+                    session: Optional[requests.Session] = None) -> Tuple[Optional[bytes], Optional[dict], Optional[str]]:
+        """
+        Stream an image from a URL, checking its header before fetching the body.
+        
+        The download stops as soon as the header shows the image is too small
+        or a likely decompression bomb, and whenever the byte cap is exceeded.
+        
+        Args:
+            url: The URL of the image to download
+            min_dimension: Minimum accepted width and height (0 to accept any size)
+            max_bytes: Maximum number of bytes to download
+            header_only: Stop after the header and return only the image info
+            session: Pooled session to download with (optional, e.g. DownloadClient.sync_session)
+            
+        Returns:
+            Tuple of (image_bytes, image_info, error_message). image_bytes is None
+            if the download failed, the image was rejected or only the header was
+            requested. image_info includes "file_size", taken from Content-Length
+            when the body was not read.
+        """
+        reader = None
+        try:
+            with (session or requests).get(url, timeout=10, stream=True) as response:
+                response.raise_for_status()
+                
+                reader = ImageStreamReader(
+                    min_dimension, max_bytes, int(response.headers.get("Content-Length") or 0)
+                )
+                
+                # Stop as soon as the header rejects the image or is all that was asked for
+                if reader.error is None:
+                    for chunk in response.iter_content(chunk_size=16384):
+                        if not reader.feed(chunk) or (header_only and reader.header_ready):
+                            # Release the half-read response's pooled connection right away
+                            response.close()
+                            break
+                
+                if header_only and reader.header_ready:
+                    return None, reader.info, None
+                
+                return reader.finish()
+        except requests.RequestException as e:
+            return None, None, f"Download failed: {str(e)}"
+        finally:
+            if reader is not None:
+                reader.close()
     
     @staticmethod
     def validate_image(image_data: BytesIO) -> Tuple[bool, Optional[Image.Image], Optional[str]]:
@@ -52,7 +226,7 @@ class ImageProcessor:
             
             # Check image dimensions
             width, height = image.size
-            if width < 300 or height < 300:
+            if width < MIN_IMAGE_DIMENSION or height < MIN_IMAGE_DIMENSION:
                 return False, None, "Image resolution too low"
                 
             return True, image, None
@@ -103,7 +277,7 @@ class ImageProcessor:
             
             # If image is very large, resize it to a reasonable size
             # Telegram has a 10MB limit for photos
-            max_dimension = 1600
+            max_dimension = MAX_IMAGE_DIMENSION
             width, height = image.size
             
             if width > max_dimension or height > max_dimension:
@@ -125,7 +299,7 @@ class ImageProcessor:
             
             # For JPEG, use quality parameter
             if format_name == "JPEG":
-                image.save(output, format=format_name, quality=95)
+                image.save(output, format=format_name, quality=IMAGE_QUALITY)
             else:
                 image.save(output, format=format_name)
                 
@@ -136,3 +310,111 @@ class ImageProcessor:
             # Return original if processing fails
             image_data.seek(0)
             return image_data
+    
+    @staticmethod
+    def process_for_telegram(image_data: bytes, min_dimension: int = MIN_IMAGE_DIMENSION,
+                             max_dimension: int = MAX_IMAGE_DIMENSION,
+                             quality: int = IMAGE_QUALITY) -> Tuple[bool, Optional[bytes], Optional[dict], Optional[str]]:
+        """
+        Validate an image and prepare it for Telegram in a single pass.
+        
+        The header is parsed once to reject undersized images before any
+        pixels are decoded, then the pixels are decoded at most once and the
+        same image is resized or re-encoded. Large JPEGs are decoded at a
+        reduced scale when that still leaves enough pixels for the target.
+        Images that already meet Telegram's photo limits are sent unchanged
+        without decoding. The chosen path ("passthrough", "resized",
+        "reencoded" or "fallback") is reported in the info dict.
+        
+        Args:
+            image_data: Encoded image bytes
+            min_dimension: Minimum accepted width and height
+            max_dimension: Maximum width and height of the output
+            quality: JPEG quality of the output
+            
+        Returns:
+            Tuple of (is_valid, output_bytes, image_info, error_message)
+        """
+        try:
+            image = Image.open(BytesIO(image_data))
+            info = ImageProcessor.get_image_info(image)
+            
+            # Check image dimensions from the header alone
+            width, height = image.size
+            if width < min_dimension or height < min_dimension:
+                return False, None, None, "Image resolution too low"
+            
+            format_name = image.format if image.format else "JPEG"
+            
+            # Compliant images are sent as they are, avoiding generation loss
+            if ImageProcessor._can_pass_through(image, image_data, max_dimension):
+                info["path"] = "passthrough"
+                return True, image_data, info, None
+            
+            # If image is very large, work out the size to shrink it to
+            new_size = None
+            if width > max_dimension or height > max_dimension:
+                if width > height:
+                    new_size = (max_dimension, int(height * (max_dimension / width)))
+                else:
+                    new_size = (int(width * (max_dimension / height)), max_dimension)
+                
+                # Let the JPEG decoder scale by 1/2, 1/4 or 1/8 in the DCT domain,
+                # never below the target size (a no-op for other formats)
+                image.draft(image.mode, new_size)
+            
+            # Decode the pixels once, corrupt or truncated data fails here
+            image.load()
+        except Exception as e:
+            return False, None, None, f"Invalid image: {str(e)}"
+        
+        try:
+            if new_size:
+                # Box-reduce by an integer factor first while staying 3x above the target, then LANCZOS
+                image = image.resize(new_size, Image.LANCZOS, reducing_gap=3.0)
+            
+            output = BytesIO()
+            
+            # For JPEG, use quality parameter
+            if format_name == "JPEG":
+                image.save(output, format=format_name, quality=quality)
+            else:
+                image.save(output, format=format_name)
+                
+            info["path"] = "resized" if new_size else "reencoded"
+            return True, output.getvalue(), info, None
+        except Exception as e:
+            print(f"Error preparing image for Telegram: {e}")
+            # Send the original if processing fails
+            info["path"] = "fallback"
+            return True, image_data, info, None
+    
+    @staticmethod
+    def _can_pass_through(image: Image.Image, image_data: bytes, max_dimension: int) -> bool:
+        """
+        Check whether an image can be sent to Telegram without re-encoding.
+        
+        Args:
+            image: PIL Image object with only the header parsed
+            image_data: Encoded image bytes
+            max_dimension: Maximum width and height of the output
+            
+        Returns:
+            True if format, mode, dimensions and byte size are all within limits
+        """
+        width, height = image.size
+        
+        if image.format not in PASSTHROUGH_FORMATS or image.mode not in ("RGB", "L"):
+            return False
+        
+        if width > max_dimension or height > max_dimension:
+            return False
+        
+        if max(width, height) / min(width, height) > TELEGRAM_PHOTO_MAX_RATIO:
+            return False
+        
+        if len(image_data) > TELEGRAM_PHOTO_MAX_BYTES:
+            return False
+        
+        # Pixels are not decoded here, so at least make sure the file is not truncated
+        return image_data.rstrip(b"\x00").endswith(END_MARKERS[image.format])
@@ -7,7 +7,11 @@ import io
 import logging
 from typing import Dict, Any, Optional, Tuple
 import requests
-from PIL import Image, ImageFilter, ImageEnhance
+from PIL import Image, ImageFilter, ImageStat
+
+from config import IMAGE_QUALITY
+from utils.image_processor import ImageProcessor
+from utils.quality_scoring import QualityScorer
 
 # Configure logging
 logging.basicConfig(
@@ -15,11 +19,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Enhancement: contrast, color saturation and brightness factors (1.0 leaves the image unchanged)
+ENHANCE_CONTRAST = 1.2
+ENHANCE_COLOR = 1.1
+ENHANCE_BRIGHTNESS = 1.05
+
+# ITU-R 601-2 luma weights, as used by Pillow for RGB to L conversion
+LUMA_WEIGHTS = (0.299, 0.587, 0.114)
+
 class ImageQualityValidator:
     """Image quality validator for ensuring high quality cover art."""
     
     def __init__(self, min_width: int = 500, min_height: int = 500, 
-                 preferred_width: int = 1000, preferred_height: int = 1000):
+                 preferred_width: int = 1000, preferred_height: int = 1000,
+                 session: Optional[requests.Session] = None):
         """
         Initialize the image quality validator.
         
@@ -28,11 +41,14 @@ class ImageQualityValidator:
             min_height: Minimum acceptable height for cover art
             preferred_width: Preferred width for high quality cover art
             preferred_height: Preferred height for high quality cover art
+            session: Pooled session for URL checks (optional, e.g. DownloadClient.sync_session)
         """
         self.min_width = min_width
         self.min_height = min_height
         self.preferred_width = preferred_width
         self.preferred_height = preferred_height
+        self.scorer = QualityScorer()
+        self.session = session
     
     def validate_image_url(self, url: str) -> Dict[str, Any]:
         """
@@ -57,20 +73,19 @@ class ImageQualityValidator:
         }
         
         try:
-            # Download image
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
+            # Read only the header, the body is not needed to judge the image
+            _, info, error = ImageProcessor.fetch_image(url, header_only=True, session=self.session)
             
-            # Get file size
-            result["file_size"] = len(response.content)
+            if info is None or error:
+                raise ValueError(error or "Download failed")
             
-            # Open image
-            img = Image.open(io.BytesIO(response.content))
+            # Get file size
+            result["file_size"] = info["file_size"]
             
             # Get image properties
-            result["width"], result["height"] = img.size
-            result["aspect_ratio"] = result["width"] / result["height"] if result["height"] > 0 else 0
-            result["format"] = img.format
+            result["width"], result["height"] = info["width"], info["height"]
+            result["aspect_ratio"] = info["aspect_ratio"]
+            result["format"] = info["format"]
             
             # Validate image
             result["is_valid"] = (
@@ -142,6 +157,15 @@ class ImageQualityValidator:
             else:
                 result["quality"] = "low"
             
+            # Judge sharpness, compression and upscaling, not only the pixel count
+            with open(file_path, "rb") as f:
+                scores = self.scorer.score_images([f.read()])[0]
+            
+            if scores:
+                result["scores"] = scores
+                if scores["degraded"] and result["quality"] == "high":
+                    result["quality"] = "medium"
+            
         except Exception as e:
             logger.error(f"Error validating image file: {e}")
             result["error"] = str(e)
@@ -169,43 +193,121 @@ class ImageQualityValidator:
         }
         
         try:
-            # Validate original image
-            original_validation = self.validate_image_file(input_path)
-            result["original_quality"] = original_validation["quality"]
+            with open(input_path, "rb") as f:
+                output_data, data_result = self.enhance_image_data(f.read())
             
-            # Open image
-            img = Image.open(input_path)
-            
-            # Apply enhancements
-            # 1. Sharpen the image
-            img = img.filter(ImageFilter.SHARPEN)
+            result.update(data_result)
             
-            # 2. Enhance contrast
-            enhancer = ImageEnhance.Contrast(img)
-            img = enhancer.enhance(1.2)  # Increase contrast by 20%
+            # Save enhanced image
+            if output_data is not None:
+                with open(output_path, "wb") as f:
+                    f.write(output_data)
             
-            # 3. Enhance color
-            enhancer = ImageEnhance.Color(img)
-            img = enhancer.enhance(1.1)  # Increase color saturation by 10%
+        except Exception as e:
+            logger.error(f"Error enhancing image: {e}")
+            result["error"] = str(e)
+        
+        return result
+    
+    def enhance_image_data(self, image_data: bytes) -> Tuple[Optional[bytes], Dict[str, Any]]:
+        """
+        Enhance an image held in memory.
+        
+        The image is decoded once, sharpened with one convolution and given
+        its contrast, color and brightness adjustments in one affine color
+        transform, then encoded once. Quality before and after is judged on
+        the decoded images, so nothing is read back from disk.
+        
+        Args:
+            image_data: Encoded image bytes
             
-            # 4. Enhance brightness
-            enhancer = ImageEnhance.Brightness(img)
-            img = enhancer.enhance(1.05)  # Increase brightness by 5%
+        Returns:
+            Tuple of (enhanced JPEG bytes or None on failure, dictionary with
+            success, original_quality, enhanced_quality and error)
+        """
+        result = {
+            "success": False,
+            "original_quality": "unknown",
+            "enhanced_quality": "unknown",
+            "error": None
+        }
+        
+        try:
+            img = Image.open(io.BytesIO(image_data))
+            img.load()
+            result["original_quality"] = self._assess_quality(img)
             
-            # Save enhanced image
-            img.save(output_path, quality=95)  # High JPEG quality
+            enhanced = self._apply_enhancements(img)
+            result["enhanced_quality"] = self._assess_quality(enhanced)
             
-            # Validate enhanced image
-            enhanced_validation = self.validate_image_file(output_path)
-            result["enhanced_quality"] = enhanced_validation["quality"]
+            output = io.BytesIO()
+            enhanced.save(output, format="JPEG", quality=IMAGE_QUALITY)
             
             result["success"] = True
+            return output.getvalue(), result
             
         except Exception as e:
             logger.error(f"Error enhancing image: {e}")
             result["error"] = str(e)
         
-        return result
+        return None, result
+    
+    @staticmethod
+    def _apply_enhancements(img: Image.Image) -> Image.Image:
+        """
+        Sharpen an image and adjust its contrast, color and brightness.
+        
+        Pillow's Contrast, Color and Brightness enhancers are each a linear
+        blend (with the mean gray, the grayscale image and black), so together
+        they form one affine map of the RGB values, applied here by a single
+        matrix conversion instead of three full-image blends.
+        
+        Args:
+            img: Decoded image
+            
+        Returns:
+            Enhanced RGB image
+        """
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        
+        # 1. Sharpen the image
+        img = img.filter(ImageFilter.SHARPEN)
+        
+        # Mean gray level the contrast is stretched around, from the band histograms
+        band_means = ImageStat.Stat(img).mean
+        mean = int(sum(weight * band for weight, band in zip(LUMA_WEIGHTS, band_means)) + 0.5)
+        
+        # 2-4. Contrast, color and brightness as one affine transform:
+        # out = b * (s * x' + (1 - s) * luma(x')), with x' = c * x + (1 - c) * mean
+        c, s, b = ENHANCE_CONTRAST, ENHANCE_COLOR, ENHANCE_BRIGHTNESS
+        offset = b * (1 - c) * mean
+        matrix = []
+        for row in range(3):
+            for column in range(3):
+                matrix.append(b * c * ((s if row == column else 0) + (1 - s) * LUMA_WEIGHTS[column]))
+            matrix.append(offset)
+        
+        return img.convert("RGB", tuple(matrix))
+    
+    def _assess_quality(self, img: Image.Image) -> str:
+        """
+        Rate a decoded image as low, medium or high quality.
+        
+        Args:
+            img: Decoded image
+            
+        Returns:
+            Quality rating
+        """
+        width, height = img.size
+        
+        if width >= self.preferred_width and height >= self.preferred_height:
+            scores = self.scorer.score_images([img])[0]
+            return "medium" if scores and scores["degraded"] else "high"
+        if width >= self.min_width and height >= self.min_height:
+            return "medium"
+        return "low"
     
     def get_quality_report(self, url_or_path: str, is_url: bool = True) -> str:
         """
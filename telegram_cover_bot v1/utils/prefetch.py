@@ -0,0 +1,173 @@
+"""
+Speculative prefetching for the Telegram Cover Bot.
+This module prepares covers a user is likely to pick next in the background,
+while they are still reading the results keyboard, and keeps them briefly so
+the selection can be answered without waiting for a download.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+from api.cache import TTLCache
+from config import (
+    PREFETCH_TTL, PREFETCH_MAX_ENTRIES, PREFETCH_MAX_BYTES, PREFETCH_CONCURRENCY
+)
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# A prefetch job: cache key and the function preparing its value (None if there is nothing to keep)
+PrefetchJob = Tuple[Hashable, Callable[[], Awaitable[Optional[Any]]]]
+
+
+class Prefetcher:
+    """
+    Per-user background preparation of values into a short-lived cache.
+    
+    Each owner (a user) has at most one running batch of jobs. Scheduling a
+    new batch, or cancelling, stops the previous one, so work for a page the
+    user has left is abandoned. Batches run their jobs one at a time and all
+    batches together prepare at most ``concurrency`` values at once, keeping
+    prefetching from crowding out requests the user is actually waiting for.
+    
+    Prepared values are handed out once: ``take`` removes them from the cache.
+    """
+    
+    def __init__(self, ttl: float = PREFETCH_TTL,
+                 max_entries: int = PREFETCH_MAX_ENTRIES,
+                 max_bytes: int = PREFETCH_MAX_BYTES,
+                 concurrency: int = PREFETCH_CONCURRENCY):
+        """
+        Initialize the prefetcher.
+        
+        Args:
+            ttl: Seconds a prepared value is kept
+            max_entries: Maximum number of prepared values kept
+            max_bytes: Maximum estimated size of all prepared values in bytes
+            concurrency: Maximum number of values prepared at once across all owners
+        """
+        self.ttl = ttl
+        self.concurrency = concurrency
+        self.cache = TTLCache(max_entries, max_bytes)
+        self._batches: Dict[Hashable, asyncio.Task] = {}
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.prepared = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.hits = 0
+        self.joined = 0
+        self.misses = 0
+    
+    def schedule(self, owner: Hashable, jobs: Sequence[PrefetchJob]) -> None:
+        """
+        Start preparing values for an owner, replacing the owner's previous batch.
+        
+        Args:
+            owner: Owner of the batch, e.g. a user ID
+            jobs: Cache keys and functions preparing their values, most likely first
+        """
+        self.cancel(owner)
+        if jobs:
+            self._batches[owner] = asyncio.create_task(self._run(owner, list(jobs)))
+    
+    def cancel(self, owner: Hashable) -> None:
+        """
+        Stop an owner's running batch. Values already prepared are kept.
+        
+        Args:
+            owner: Owner of the batch
+        """
+        batch = self._batches.pop(owner, None)
+        if batch is not None and not batch.done():
+            batch.cancel()
+            self.cancelled += 1
+    
+    async def _run(self, owner: Hashable, jobs: Sequence[PrefetchJob]) -> None:
+        """Prepare the values of a batch in order, skipping keys already prepared or in progress."""
+        # Created on first use so it belongs to the running event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        
+        try:
+            for key, factory in jobs:
+                if key in self._pending or key in self.cache:
+                    continue
+                
+                async with self._slots:
+                    future = asyncio.ensure_future(self._prepare(key, factory))
+                    self._pending[key] = future
+                    try:
+                        await future
+                    except asyncio.CancelledError:
+                        future.cancel()
+                        raise
+                    except Exception as e:
+                        self.failed += 1
+                        logger.warning(f"Prefetch of {key} failed: {e}")
+                    finally:
+                        del self._pending[key]
+        finally:
+            if self._batches.get(owner) is asyncio.current_task():
+                del self._batches[owner]
+    
+    async def _prepare(self, key: Hashable, factory: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        """Prepare one value and cache it before anyone waiting on it resumes."""
+        value = await factory()
+        if value is not None:
+            self.cache.set(key, value, self.ttl)
+            self.prepared += 1
+        return value
+    
+    async def take(self, key: Hashable) -> Optional[Any]:
+        """
+        Take a prepared value, waiting for it if it is being prepared right now.
+        
+        Args:
+            key: Cache key
+        
+        Returns:
+            The prepared value or None if it was not prefetched, failed or was cancelled
+        """
+        future = self._pending.get(key)
+        if future is not None:
+            # wait() rather than await, so a cancelled batch does not cancel the caller
+            await asyncio.wait({future})
+            if future.cancelled() or future.exception() is not None or future.result() is None:
+                self.misses += 1
+                return None
+            self.cache.invalidate(key)
+            self.joined += 1
+            return future.result()
+        
+        value = self.cache.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        
+        self.cache.invalidate(key)
+        self.hits += 1
+        return value
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get prefetch statistics.
+        
+        Returns:
+            Dictionary with prepared, cancelled and failed counts, values taken
+            from the cache, taken by waiting on a running job and not prefetched,
+            and the number of running batches and cached values
+        """
+        return {
+            "prepared": self.prepared,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+            "hits": self.hits,
+            "joined": self.joined,
+            "misses": self.misses,
+            "running": len(self._batches),
+            "cached": len(self.cache)
+        }
@@ -0,0 +1,188 @@
+"""
+Image quality scoring for the Telegram Cover Bot.
+This module estimates sharpness, JPEG blockiness and upscaling of covers from
+their luminance, scoring many candidates in one vectorized pass so the best
+one can be picked without judging by pixel dimensions alone.
+"""
+import logging
+from io import BytesIO
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from config import (
+    QUALITY_SCORE_SIZE, QUALITY_MAX_BLOCKINESS, QUALITY_MIN_EFFECTIVE_RESOLUTION
+)
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# Number of radial frequency bands used to estimate the effective resolution
+FREQUENCY_BANDS = 32
+
+# Share of spectral energy that must lie below the effective resolution
+ENERGY_FRACTION = 0.99
+
+
+class QualityScorer:
+    """
+    Batched no-reference quality metrics for cover images.
+    
+    Each image is reduced to two luminance planes of the same size: a
+    downsampled view of the whole cover, used for sharpness, and a native
+    resolution center crop aligned to the 8x8 JPEG grid, used for blockiness
+    and upscaling. All candidates are stacked into one array and scored
+    together.
+    """
+    
+    def __init__(self, size: int = QUALITY_SCORE_SIZE):
+        """
+        Initialize the scorer.
+        
+        Args:
+            size: Width and height of the luminance planes, a multiple of 8
+        """
+        self.size = size
+        
+        # One-hot map from each FFT coefficient to its radial frequency band,
+        # so band energies of the whole batch come out of one matrix product
+        fy = np.fft.fftfreq(size)[:, None]
+        fx = np.fft.rfftfreq(size)[None, :]
+        radius = np.minimum(np.sqrt(fx ** 2 + fy ** 2) / 0.5, 0.999)
+        bands = (radius * FREQUENCY_BANDS).astype(int).ravel()
+        self._band_map = np.zeros((bands.size, FREQUENCY_BANDS), dtype=np.float32)
+        self._band_map[np.arange(bands.size), bands] = 1.0
+    
+    def load_planes(self, image: Union[bytes, Image.Image]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Decode an image into its downsampled and native luminance planes.
+        
+        Args:
+            image: Encoded image bytes or an already decoded image
+        
+        Returns:
+            Tuple of (downsampled plane, native crop) as float32 arrays
+        """
+        if isinstance(image, bytes):
+            image = Image.open(BytesIO(image))
+        gray = image.convert("L")
+        width, height = gray.size
+        size = self.size
+        
+        plane = gray.resize((size, size), Image.BOX)
+        
+        if width < size or height < size:
+            crop = plane
+        else:
+            left = (width - size) // 2 // 8 * 8
+            top = (height - size) // 2 // 8 * 8
+            crop = gray.crop((left, top, left + size, top + size))
+        
+        return np.asarray(plane, dtype=np.float32), np.asarray(crop, dtype=np.float32)
+    
+    def score_planes(self, planes: np.ndarray, crops: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Score a batch of luminance planes.
+        
+        Args:
+            planes: Downsampled planes with shape (N, size, size)
+            crops: Native resolution crops with shape (N, size, size)
+        
+        Returns:
+            Dictionary of per-image arrays: sharpness (Laplacian variance),
+            blockiness (edge strength on the 8px grid relative to elsewhere,
+            about 1.0 for clean images), effective_resolution (share of the
+            pixel grid carrying detail, low for upscaled images) and score
+            (combined ranking value, higher is better)
+        """
+        # Sharpness: variance of the 4-neighbour Laplacian
+        laplacian = (
+            planes[:, :-2, 1:-1] + planes[:, 2:, 1:-1] + planes[:, 1:-1, :-2] + planes[:, 1:-1, 2:]
+            - 4 * planes[:, 1:-1, 1:-1]
+        )
+        sharpness = laplacian.var(axis=(1, 2))
+        
+        # Blockiness: mean step across 8x8 block boundaries versus the mean step overall
+        horizontal = np.abs(np.diff(crops, axis=2))
+        vertical = np.abs(np.diff(crops, axis=1))
+        boundary = horizontal[:, :, 7::8].mean(axis=(1, 2)) + vertical[:, 7::8, :].mean(axis=(1, 2))
+        overall = horizontal.mean(axis=(1, 2)) + vertical.mean(axis=(1, 2))
+        blockiness = boundary / (overall + 1e-6)
+        
+        # Effective resolution: frequency below which nearly all detail energy lies
+        centered = crops - crops.mean(axis=(1, 2), keepdims=True)
+        spectrum = np.abs(np.fft.rfft2(centered)) ** 2
+        band_energy = spectrum.reshape(len(crops), -1) @ self._band_map
+        band_energy[:, 0] = 0.0
+        cumulative = np.cumsum(band_energy, axis=1) / (band_energy.sum(axis=1, keepdims=True) + 1e-6)
+        effective_resolution = ((cumulative < ENERGY_FRACTION).sum(axis=1) + 1) / FREQUENCY_BANDS
+        
+        score = effective_resolution * np.log1p(sharpness) / np.maximum(blockiness, 1.0)
+        
+        return {
+            "sharpness": sharpness,
+            "blockiness": blockiness,
+            "effective_resolution": effective_resolution,
+            "score": score
+        }
+    
+    def score_images(self, images: Sequence[Union[bytes, Image.Image]]) -> List[Optional[Dict[str, float]]]:
+        """
+        Score a batch of images.
+        
+        Args:
+            images: Encoded image bytes or decoded images of each candidate
+        
+        Returns:
+            Metrics for each image, with a "degraded" flag for covers that look
+            upscaled or heavily compressed, or None for images that could not be decoded
+        """
+        results: List[Optional[Dict[str, float]]] = [None] * len(images)
+        planes, crops, indexes = [], [], []
+        
+        for index, image in enumerate(images):
+            try:
+                plane, crop = self.load_planes(image)
+            except Exception as e:
+                logger.warning(f"Could not score image {index}: {e}")
+                continue
+            planes.append(plane)
+            crops.append(crop)
+            indexes.append(index)
+        
+        if not indexes:
+            return results
+        
+        metrics = self.score_planes(np.stack(planes), np.stack(crops))
+        
+        for row, index in enumerate(indexes):
+            result = {name: float(values[row]) for name, values in metrics.items()}
+            result["degraded"] = (
+                result["blockiness"] > QUALITY_MAX_BLOCKINESS
+                or result["effective_resolution"] < QUALITY_MIN_EFFECTIVE_RESOLUTION
+            )
+            results[index] = result
+        
+        return results
+    
+    def best(self, images: Sequence[bytes]) -> Optional[int]:
+        """
+        Pick the best of several candidate images.
+        
+        Args:
+            images: Encoded image bytes of each candidate
+        
+        Returns:
+            Index of the highest scoring image or None if none could be decoded
+        """
+        scores = self.score_images(images)
+        candidates = [(result["score"], -index) for index, result in enumerate(scores) if result]
+        
+        if not candidates:
+            return None
+        
+        return -max(candidates)[1]
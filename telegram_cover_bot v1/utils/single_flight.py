@@ -0,0 +1,67 @@
+"""
+Request coalescing module for the Telegram Cover Bot.
+This module lets concurrent callers asking for the same key share one
+in-flight operation instead of issuing duplicate upstream requests.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into a single execution."""
+    
+    def __init__(self):
+        """Initialize the single-flight group."""
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.executions = 0
+        self.collapsed = 0
+    
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run an operation once for all concurrent callers with the same key.
+        
+        The first caller starts the operation; callers arriving while it is
+        still running await the same future. A caller being cancelled does not
+        cancel the shared operation for the others.
+        
+        Args:
+            key: Key identifying the operation
+            factory: Function returning the awaitable to run
+        
+        Returns:
+            The result of the shared operation
+        """
+        future = self._in_flight.get(key)
+        
+        if future is not None:
+            self.collapsed += 1
+            return await asyncio.shield(future)
+        
+        self.executions += 1
+        future = asyncio.ensure_future(factory())
+        self._in_flight[key] = future
+        future.add_done_callback(lambda done: self._forget(key, done))
+        
+        return await asyncio.shield(future)
+    
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        """Drop a finished operation so the next call starts a fresh one."""
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+        
+        # Mark the exception as retrieved if every caller was cancelled
+        if not future.cancelled():
+            future.exception()
+    
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get coalescing statistics.
+        
+        Returns:
+            Dictionary with executed, collapsed and in-flight counts
+        """
+        return {
+            "executions": self.executions,
+            "collapsed": self.collapsed,
+            "in_flight": len(self._in_flight)
+        }
@@ -0,0 +1,134 @@
+"""
+Batched SQLite writes for the Telegram Cover Bot.
+This module queues the write statements of the in-memory caches and commits
+them together on a worker thread, so handlers never wait on the database.
+"""
+import asyncio
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, List, Tuple
+
+from config import SQLITE_FLUSH_BATCH
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+class WriteBehind:
+    """
+    Ordered write queue in front of a SQLite connection.
+    
+    Statements are applied in the order they were queued, in a single
+    transaction per flush. Called from the event loop, a flush runs in the
+    default executor; called without a running loop, it runs inline. The
+    caller's in-memory state stays authoritative, the database only has to
+    catch up before the next start.
+    """
+    
+    def __init__(self, conn: sqlite3.Connection, name: str, batch_size: int = SQLITE_FLUSH_BATCH):
+        """
+        Initialize the write queue.
+        
+        Args:
+            conn: Connection opened with check_same_thread=False
+            name: Name used in log messages, e.g. "file ID cache"
+            batch_size: Number of deferred statements that triggers a flush
+        """
+        self.name = name
+        self.batch_size = batch_size
+        self._conn = conn
+        self._pending: List[Tuple[str, Tuple]] = []
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._scheduled = False
+        self.flushes = 0
+        self.statements = 0
+    
+    def execute(self, sql: str, params: Tuple) -> None:
+        """
+        Queue a write statement and schedule a flush.
+        
+        Args:
+            sql: Statement to run
+            params: Statement parameters
+        """
+        with self._lock:
+            self._pending.append((sql, params))
+        self._schedule()
+    
+    def defer(self, sql: str, params: Tuple) -> None:
+        """
+        Queue a write statement that may wait for the next batch, e.g. a usage timestamp.
+        
+        Args:
+            sql: Statement to run
+            params: Statement parameters
+        """
+        with self._lock:
+            self._pending.append((sql, params))
+            if len(self._pending) < self.batch_size:
+                return
+        self._schedule()
+    
+    def _schedule(self) -> None:
+        """Start a flush unless one is already waiting to run."""
+        with self._lock:
+            if self._scheduled:
+                return
+            self._scheduled = True
+        
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        
+        loop.run_in_executor(None, self.flush)
+    
+    def flush(self) -> None:
+        """Write every queued statement in one transaction."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._scheduled = False
+        
+        if not pending:
+            return
+        
+        with self._db_lock:
+            if self._conn is None:
+                return
+            
+            try:
+                for sql, params in pending:
+                    self._conn.execute(sql, params)
+                self._conn.commit()
+                self.flushes += 1
+                self.statements += len(pending)
+            except sqlite3.Error as e:
+                self._conn.rollback()
+                logger.error(f"Error writing {self.name}: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get write statistics.
+        
+        Returns:
+            Dictionary with flush and statement counts and queued statements
+        """
+        return {
+            "flushes": self.flushes,
+            "statements": self.statements,
+            "pending": len(self._pending)
+        }
+    
+    def close(self) -> None:
+        """Write the queued statements and close the connection."""
+        self.flush()
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = None
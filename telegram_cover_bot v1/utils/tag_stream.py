@@ -0,0 +1,97 @@
+"""
+Audio tag location for the Telegram Cover Bot.
+This module finds where the metadata of an audio file ends from its first
+bytes, so a download can stop as soon as the tags and embedded pictures have
+arrived instead of fetching the whole file.
+"""
+from typing import Optional, Tuple
+
+# Outcomes of locate_tags
+NEED_MORE = "more"  # More bytes are needed to tell where the tags end
+COMPLETE = "complete"  # The tags end within the returned number of bytes
+NEED_FULL = "full"  # The tags can only be read from the whole file
+
+# File extension telling the tag parser each container found at the start of a file
+EXTENSIONS = {"id3": ".mp3", "flac": ".flac", "mp4": ".m4a"}
+
+# Length of an ID3v2 header and of its optional footer
+ID3_HEADER_BYTES = 10
+
+# Tag location: (state, size, container)
+TagLocation = Tuple[str, int, Optional[str]]
+
+
+def locate_tags(head: bytes) -> TagLocation:
+    """
+    Find where the tags of an audio file end.
+    
+    ID3v2 tags, FLAC metadata blocks and an MP4 moov atom placed before the
+    media data all sit at the start of the file. ID3v1 tags, Ogg comments
+    and MP4 files with the moov atom after the media data need the whole file.
+    
+    Args:
+        head: First bytes of the file
+    
+    Returns:
+        Tuple of (state, size, container): NEED_MORE with the number of bytes
+        needed to go on, COMPLETE with the length of the prefix holding the
+        tags and the container ("id3", "flac" or "mp4"), or NEED_FULL
+    """
+    if len(head) < ID3_HEADER_BYTES:
+        return NEED_MORE, ID3_HEADER_BYTES, None
+    
+    # An ID3v2 tag may precede MP3 and FLAC audio, its size is stored as a syncsafe integer
+    offset = 0
+    if head[:3] == b"ID3":
+        size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+        offset = ID3_HEADER_BYTES + size + (ID3_HEADER_BYTES if head[5] & 0x10 else 0)
+    
+    if len(head) < offset + 8:
+        return NEED_MORE, offset + 8, None
+    
+    if head[offset:offset + 4] == b"fLaC":
+        return _locate_flac(head, offset + 4)
+    if offset:
+        return COMPLETE, offset, "id3"
+    if head[4:8] == b"ftyp":
+        return _locate_mp4(head)
+    
+    return NEED_FULL, 0, None
+
+
+def _locate_flac(head: bytes, offset: int) -> TagLocation:
+    """Walk the FLAC metadata blocks to the end of the last one."""
+    while True:
+        if len(head) < offset + 4:
+            return NEED_MORE, offset + 4, None
+        
+        header = head[offset]
+        offset += 4 + int.from_bytes(head[offset + 1:offset + 4], "big")
+        
+        # The high bit marks the last metadata block
+        if header & 0x80:
+            return COMPLETE, offset, "flac"
+
+
+def _locate_mp4(head: bytes) -> TagLocation:
+    """Walk the top-level MP4 atoms to the end of the moov atom."""
+    offset = 0
+    while True:
+        if len(head) < offset + 8:
+            return NEED_MORE, offset + 8, None
+        
+        size = int.from_bytes(head[offset:offset + 4], "big")
+        kind = head[offset + 4:offset + 8]
+        
+        # A size of 1 means a 64-bit size follows, 0 means the atom runs to the end of the file
+        if size == 1:
+            if len(head) < offset + 16:
+                return NEED_MORE, offset + 16, None
+            size = int.from_bytes(head[offset + 8:offset + 16], "big")
+        
+        if kind == b"moov" and size >= 8:
+            return COMPLETE, offset + size, "mp4"
+        if kind == b"mdat" or size < 8:
+            return NEED_FULL, 0, None
+        
+        offset += size
@@ -47,6 +47,9 @@ class TranslationManager:
             'error_loading': 'عذراً، حدث خطأ أثناء تحميل الغلاف.',
             'no_cover_found': 'عذراً، لا يمكن العثور على غلاف لهذه الأغنية.',
             'invalid_image': 'عذراً، الصورة غير صالحة: {error}',
+            'api_busy': 'الخدمة مشغولة حالياً بسبب كثرة الطلبات. الرجاء المحاولة بعد قليل.',
+            'higher_resolution_found': '✅ تم العثور على نسخة بدقة أعلى من هذا الغلاف: {width}×{height} بكسل',
+            'no_higher_resolution': 'لم يتم العثور على نسخة بدقة أعلى من هذه الصورة.',
             'image_quality': '📊 جودة الصورة: {width}×{height} بكسل',
             'share_message': 'شارك هذا البوت مع أصدقائك:',
             'share_text': '🎵 وجدت بوت رائع لجلب أغلفة الأغاني بجودة عالية! جربه الآن: https://t.me/{bot_username}',
@@ -99,6 +102,9 @@ class TranslationManager:
             'error_loading': 'Sorry, an error occurred while loading the cover.',
             'no_cover_found': 'Sorry, no cover could be found for this song.',
             'invalid_image': 'Sorry, the image is invalid: {error}',
+            'api_busy': 'The service is busy right now due to high demand. Please try again in a moment.',
+            'higher_resolution_found': '✅ Found a higher resolution version of this cover: {width}×{height} pixels',
+            'no_higher_resolution': 'No higher resolution version of this picture was found.',
             'image_quality': '📊 Image quality: {width}×{height} pixels',
             'share_message': 'Share this bot with your friends:',
             'share_text': '🎵 I found an amazing bot for fetching high-quality song covers! Try it now: https://t.me/{bot_username}',
@@ -151,6 +157,9 @@ class TranslationManager:
             'error_loading': 'Lo siento, ocurrió un error al cargar la portada.',
             'no_cover_found': 'Lo siento, no se pudo encontrar una portada para esta canción.',
             'invalid_image': 'Lo siento, la imagen no es válida: {error}',
+            'api_busy': 'El servicio está ocupado en este momento por la alta demanda. Inténtalo de nuevo en un momento.',
+            'higher_resolution_found': '✅ Se encontró una versión de mayor resolución de esta portada: {width}×{height} píxeles',
+            'no_higher_resolution': 'No se encontró una versión de mayor resolución de esta imagen.',
             'image_quality': '📊 Calidad de imagen: {width}×{height} píxeles',
             'share_message': 'Comparte este bot con tus amigos:',
             'share_text': '🎵 ¡Encontré un bot increíble para obtener portadas de canciones de alta calidad! Pruébalo ahora: https://t.me/{bot_username}',